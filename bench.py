@@ -0,0 +1,192 @@
+"""Tk-free benchmarks for the to-do model (todomodel.py).
+
+    python bench.py                  # 1k, 10k and 100k tasks
+    python bench.py 500 50000        # other sizes
+    python bench.py --durability none
+
+Every size runs against a fresh temporary directory and reports
+milliseconds for: loading a page from disk (fully, up to the first
+chunk a progressive startup paints, and the longest of the later steps,
+during which the UI would not respond), saving a full snapshot,
+one search keystroke (exact, and fuzzy top-20), deleting a task (with the
+re-layout of a screenful of rows), and switching tabs to a page on disk
+(cold) or already open (warm).
+
+A second table gives the memory per task (tracemalloc): a bare Task
+record, the same fields as a plain dict for comparison, and a whole page
+(records plus search index). Task texts are not counted.
+"""
+import argparse
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import todomodel
+from todomodel import Notebook, Page, Task, row_y
+
+WORDS = ("buy", "milk", "call", "mom", "fix", "bike", "email", "report",
+         "book", "flight", "pay", "rent", "clean", "desk", "read", "paper")
+QUERY = "email report"   # typed one key at a time
+FUZZY_QUERY = "emial reprot"  # the same with typos, for the fuzzy search
+FUZZY_TOP = 20
+DELETES = 200
+VIEWPORT_ROWS = 25
+
+
+def fill(page, n, rng):
+    """Give a page n random tasks without timing it."""
+    page.tasks = [
+        Task(" ".join(rng.choice(WORDS) for _ in range(4)) + f" #{i}",
+             rng.random() < 0.2, rng.randrange(4))
+        for i in range(n)
+    ]
+    page.rebuild_index()
+    page.save_tasks()
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def layout_listener(page):
+    """Stand-in for the canvas: recompute the rows of one screenful."""
+    def on_event(event, *args):
+        if event == "remove":
+            index = args[1]
+            first = max(0, index - VIEWPORT_ROWS // 2)
+            last = min(len(page.tasks), first + VIEWPORT_ROWS)
+            [(page.tasks[i].id, row_y(i)) for i in range(first, last)]
+    return on_event
+
+
+def bench(n, rng):
+    directory = tempfile.mkdtemp(prefix="todo-bench-")
+    try:
+        notebook = Notebook(directory)
+        notebook.load_index()
+        notebook.saver.start()
+        fill(notebook.page(), n, rng)
+        other = notebook.add_page()
+        fill(notebook.page(other), n, rng)
+        notebook.flush(timeout=600)
+
+        result = {}
+
+        # load: a fresh notebook reads the current page from disk
+        fresh = Notebook(directory)
+        fresh.load_index()
+        result["load"] = timed(fresh.page)
+        page = fresh.page()
+        fresh.saver.start()
+
+        steps = Page(page.path, fresh.saver).load_steps()
+        result["first chunk"] = timed(lambda: next(steps, None))
+        result["longest step"] = 0
+        end = object()
+        while True:
+            start = time.perf_counter()
+            finished = next(steps, end) is end
+            step = (time.perf_counter() - start) * 1000
+            result["longest step"] = max(result["longest step"], step)
+            if finished:
+                break
+
+        # save: one full snapshot, written by the worker
+        def save():
+            page.save_tasks()
+            fresh.flush(timeout=600)
+        result["save"] = timed(save)
+
+        # search: per keystroke, narrowing like the search bar does
+        def search():
+            matches = None
+            for i in range(1, len(QUERY) + 1):
+                matches = page.find(QUERY[:i], matches if i > 3 else None)
+        result["search"] = timed(search) / len(QUERY)
+
+        page.build_word_index()  # built by the first fuzzy search in the app
+
+        def fuzzy():
+            for i in range(1, len(FUZZY_QUERY) + 1):
+                page.fuzzy_find(FUZZY_QUERY[:i], FUZZY_TOP)
+        result["fuzzy"] = timed(fuzzy) / len(FUZZY_QUERY)
+
+        # delete + re-layout, averaged over random rows
+        page.subscribe(layout_listener(page))
+        victims = [page.tasks[rng.randrange(len(page.tasks))]
+                   for _ in range(min(DELETES, n // 2))]
+        victims = list({t.id: t for t in victims}.values())
+
+        def delete():
+            for task in victims:
+                page.delete_task(task)
+        result["delete"] = timed(delete) / len(victims)
+        fresh.flush(timeout=600)
+
+        # tab switch: the other page is on disk, then both are open
+        first = fresh.current
+        result["switch cold"] = timed(lambda: fresh.switch(other))
+        result["switch warm"] = timed(lambda: fresh.switch(first))
+        fresh.flush(timeout=600)
+        return result
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def memory(n, rng):
+    """Bytes per task for slotted records, dict records and a full page."""
+    texts = [" ".join(rng.choice(WORDS) for _ in range(4)) + f" #{i}" for i in range(n)]
+    result = {}
+
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    records = [Task(text) for text in texts]
+    result["Task"] = (tracemalloc.get_traced_memory()[0] - base) / n
+    del records
+
+    base = tracemalloc.get_traced_memory()[0]
+    records = [{"id": i, "text": text, "done": False, "priority": 0, "row": None}
+               for i, text in enumerate(texts)]
+    result["dict"] = (tracemalloc.get_traced_memory()[0] - base) / n
+    del records
+
+    base = tracemalloc.get_traced_memory()[0]
+    page = Page(None, None)
+    page.tasks = [Task(text) for text in texts]
+    page.rebuild_index()
+    result["page"] = (tracemalloc.get_traced_memory()[0] - base) / n
+    tracemalloc.stop()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("sizes", nargs="*", type=int, default=[1000, 10000, 100000])
+    parser.add_argument("--durability", choices=("none", "batch"),
+                        default=todomodel.SAVE_DURABILITY)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    todomodel.SAVE_DURABILITY = args.durability
+
+    rng = random.Random(args.seed)
+    columns = ("load", "first chunk", "longest step", "save", "search", "fuzzy",
+               "delete", "switch cold", "switch warm")
+    print(f"{'tasks':>8}" + "".join(f"{c:>13}" for c in columns) + "   (ms)")
+    for n in args.sizes:
+        result = bench(n, rng)
+        print(f"{n:>8}" + "".join(f"{result[c]:>13.3f}" for c in columns))
+
+    columns = ("Task", "dict", "page")
+    print()
+    print(f"{'tasks':>8}" + "".join(f"{c:>13}" for c in columns) + "   (bytes per task)")
+    for n in args.sizes:
+        result = memory(n, rng)
+        print(f"{n:>8}" + "".join(f"{result[c]:>13.0f}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,1340 +1,2194 @@
-import tkinter as tk
-import time
-import threading
-import random
-import openai  # pip install openai
-
-FILENAME = "Tasks.txt"
-
-# =========================
-# THEME SYSTEM
-# =========================
-current_theme = "light"
-
-THEMES = {
-    "light": {
-        "BG_WINDOW": "#f0f0f0",
-        "BG_CANVAS": "#fdfcf7",
-        "BG_COMPLETED": "#f5f5f5",
-        "FG_TEXT": "#222222",
-        "FG_SUBTLE": "#999999",
-        "LINE_BLUE": "#d3e4ff",
-        "LINE_MARGIN": "#ff9999",
-        "BTN_BG": "#ffffff",
-        "BTN_FG": "#333333",
-        "DIM_TEXT": "#bbbbbb",
-    },
-    "dark": {
-        "BG_WINDOW": "#1e1e1e",
-        "BG_CANVAS": "#252526",
-        "BG_COMPLETED": "#1e1e1e",
-        "FG_TEXT": "#f5f5f5",
-        "FG_SUBTLE": "#777777",
-        "LINE_BLUE": "#3a4d6e",
-        "LINE_MARGIN": "#a65c5c",
-        "BTN_BG": "#3a3d41",
-        "BTN_FG": "#f5f5f5",
-        "DIM_TEXT": "#555555",
-    }
-}
-
-COLORS = THEMES[current_theme].copy()
-
-# =========================
-# GLOBAL STATE
-# =========================
-tasks = []            # list of {text, done, chars, check, y, box, priority, star}
-completed_tasks = []  # list of {"text": str, "priority": int}
-postits = []          # list of post-it dicts
-
-# typing state
-current_text = ""
-current_text_items = []
-caret = None
-caret_active = False
-current_y = None
-
-# post-it placement state
-placing_postit = False
-postit_text_to_place = ""
-postit_color_to_place = "#FFF9B0"
-preview_postit = None  # {"rect": ..., "text": ...}
-
-# dragging post-its
-dragging_postit = None
-last_drag_pos = (0, 0)
-
-CHAR_WIDTH = 10
-TEXT_START_X = 70
-LINE_START_Y = 70
-LINE_HEIGHT = 30
-
-NOTE_WIDTH_RATIO = 0.75      # writing area
-COMPLETE_WIDTH_RATIO = 0.25  # completed area
-
-POSTIT_COLORS = {
-    "Yellow": "#FFF9B0",
-    "Pink":   "#FFD1DC",
-    "Blue":   "#D0E8FF",
-    "Green":  "#E4FFD1",
-    "Purple": "#EAD9FF",
-}
-
-# widgets (assigned later)
-window = None
-canvas = None
-completed_canvas = None
-postit_button = None
-search_label = None
-search_entry = None
-ai_button = None
-toggle_canvas = None
-toggle_bg = None
-toggle_knob = None
-tab_frame = None
-cleanup_button = None
-
-# tabs
-tabs = {}          # name -> {"tasks": [...], "completed": [...], "postits": [...]}
-current_tab = None
-
-
-# =========================
-# THEME APPLY
-# =========================
-def apply_theme():
-    global COLORS
-    COLORS = THEMES[current_theme].copy()
-
-    if window is None:
-        return
-
-    window.configure(bg=COLORS["BG_WINDOW"])
-    if canvas:
-        canvas.configure(bg=COLORS["BG_CANVAS"])
-    if completed_canvas:
-        completed_canvas.configure(bg=COLORS["BG_COMPLETED"])
-        for item in completed_canvas.find_all():
-            completed_canvas.itemconfig(item, fill=COLORS["FG_TEXT"])
-
-    if postit_button:
-        postit_button.configure(bg=COLORS["BTN_BG"], fg=COLORS["BTN_FG"])
-    if search_label:
-        search_label.configure(bg=COLORS["BG_WINDOW"], fg=COLORS["FG_TEXT"])
-    if search_entry:
-        search_entry.configure(
-            bg=COLORS["BG_CANVAS"],
-            fg=COLORS["FG_TEXT"],
-            insertbackground=COLORS["FG_TEXT"],
-        )
-    if ai_button:
-        ai_button.configure(bg=COLORS["BTN_BG"], fg=COLORS["BTN_FG"])
-    if cleanup_button:
-        cleanup_button.configure(bg=COLORS["BTN_BG"], fg=COLORS["BTN_FG"])
-
-    # Recolor tasks
-    for t in tasks:
-        canvas.itemconfig(t["box"], outline=COLORS["FG_SUBTLE"])
-        canvas.itemconfig(t["check"], fill=COLORS["FG_TEXT"] if t["done"] else "")
-        for ch_item in t["chars"]:
-            canvas.itemconfig(ch_item, fill=COLORS["FG_TEXT"])
-        canvas.itemconfig(t["star"], fill="#e6b800")
-
-    redraw_lines()
-
-
-# =========================
-# TASKS: SAVE / CREATE / ERASE / COMPLETE
-# =========================
-def save_tasks():
-    with open(FILENAME, "w", encoding="utf-8") as f:
-        for t in tasks:
-            f.write(f"{t['text']}||{t['done']}||{t['priority']}\n")
-
-
-def create_task(text, done=False, priority=0):
-    """Create a new task at the bottom of the list."""
-    y = LINE_START_Y + len(tasks) * LINE_HEIGHT
-
-    # checkbox
-    box = canvas.create_rectangle(
-        35, y - 10, 50, y + 5,
-        outline=COLORS["FG_SUBTLE"], width=2
-    )
-
-    # checkmark
-    check = canvas.create_line(
-        37, y - 2, 43, y + 3, 48, y - 7,
-        width=2,
-        fill=COLORS["FG_TEXT"] if done else "",
-    )
-
-    # one canvas text item per letter
-    char_items = []
-    for i, ch in enumerate(text):
-        item = canvas.create_text(
-            TEXT_START_X + i * CHAR_WIDTH, y - 2,
-            text=ch,
-            anchor="w",
-            font=("Courier New", 14),
-            fill=COLORS["FG_TEXT"]
-        )
-        char_items.append(item)
-
-    # priority stars
-    star_x = max(200, canvas.winfo_width() * 0.72 or 480)
-    stars_text = "★" * priority + "☆" * (3 - priority)
-    star_item = canvas.create_text(
-        star_x, y - 2,
-        text=stars_text,
-        anchor="e",
-        font=("Courier New", 14),
-        fill="#e6b800"
-    )
-
-    task = {
-        "text": text,
-        "done": done,
-        "chars": char_items,
-        "check": check,
-        "y": y,
-        "box": box,
-        "priority": priority,
-        "star": star_item,
-    }
-
-    tasks.append(task)
-
-    # click bindings
-    canvas.tag_bind(box, "<Button-1>", lambda e, t=task: toggle_task(t))
-    canvas.tag_bind(check, "<Button-1>", lambda e, t=task: toggle_task(t))
-    canvas.tag_bind(star_item, "<Button-1>", lambda e, t=task: toggle_priority(t))
-    for ch_item in char_items:
-        canvas.tag_bind(ch_item, "<Button-1>", lambda e, t=task: toggle_task(t))
-
-
-# ------------------- ERASER CRUMBS ----------------------
-def spawn_crumb(x, y):
-    """Small crumb that falls and fades."""
-    crumb = canvas.create_oval(x, y, x + 3, y + 3, fill="#C8B8A8", outline="")
-
-    def animate():
-        for i in range(15):
-            dx = random.randint(-1, 1)
-            dy = random.randint(1, 3)
-            canvas.move(crumb, dx, dy)
-            alpha = max(0, 255 - i * 12)
-            canvas.itemconfig(crumb, fill=f"#{alpha:02x}{alpha:02x}{alpha:02x}")
-            canvas.update()
-            time.sleep(0.02)
-        canvas.delete(crumb)
-
-    threading.Thread(target=animate, daemon=True).start()
-
-
-def erase_animation(task, on_finish=None):
-    """Erase letters with fade + crumbs."""
-    for item in task["chars"]:
-        box = canvas.bbox(item)
-        if box:
-            mid_x = (box[0] + box[2]) // 2
-            mid_y = (box[1] + box[3]) // 2
-        else:
-            mid_x = mid_y = 0
-
-        for alpha in range(255, -1, -15):
-            canvas.itemconfig(item, fill=f"#{alpha:02x}{alpha:02x}{alpha:02x}")
-            if alpha % 45 == 0 and box:
-                spawn_crumb(mid_x, mid_y)
-            canvas.update()
-            time.sleep(0.01)
-
-        canvas.itemconfig(item, text="")
-
-    if on_finish:
-        on_finish()
-
-
-# ---------------- COMPLETED TASKS COLUMN ----------------
-def add_completed_task(text, priority=0):
-    y = 60 + len(completed_tasks) * 25
-
-    text_id = completed_canvas.create_text(
-        10,
-        y,
-        anchor="w",
-        font=("Courier New", 12),
-        text=text,
-        fill=COLORS["FG_TEXT"],
-    )
-
-    # strikethrough
-    bbox = completed_canvas.bbox(text_id)
-    if bbox:
-        x1, y1, x2, y2 = bbox
-        completed_canvas.create_line(
-            x1, (y1 + y2) // 2, x2, (y1 + y2) // 2,
-            fill=COLORS["FG_TEXT"],
-            width=2
-        )
-
-    stars_text = "★" * priority + "☆" * (3 - priority)
-    completed_canvas.create_text(
-        completed_canvas.winfo_width() - 10,
-        y,
-        anchor="e",
-        font=("Courier New", 10),
-        text=stars_text,
-        fill="#e6b800"
-    )
-
-    completed_tasks.append({"text": text, "priority": priority})
-
-
-# ------------------ PRIORITY STARS ----------------------
-def toggle_priority(task):
-    task["priority"] = (task["priority"] + 1) % 4
-    stars_text = "★" * task["priority"] + "☆" * (3 - task["priority"])
-    canvas.itemconfig(task["star"], text=stars_text)
-    save_tasks()
-
-
-# ---------------- CHECK / UNCHECK TASK ------------------
-def toggle_task(task):
-    if not task["done"]:
-        task["done"] = True
-        canvas.itemconfig(task["check"], fill=COLORS["FG_TEXT"])
-
-        def after():
-            add_completed_task(task["text"], task["priority"])
-            delete_task(task)
-
-        threading.Thread(
-            target=erase_animation,
-            args=(task, after),
-            daemon=True
-        ).start()
-    else:
-        task["done"] = False
-        canvas.itemconfig(task["check"], fill="")
-        for i, ch in enumerate(task["text"]):
-            canvas.itemconfig(task["chars"][i], text=ch, fill=COLORS["FG_TEXT"])
-
-    save_tasks()
-
-
-def delete_task(task):
-    # unpin post-its attached to this task
-    for p in postits:
-        if p.get("pinned_task") is task:
-            p["pinned_task"] = None
-            canvas.itemconfig(p["pin"], fill="grey")
-
-    for item in task["chars"]:
-        canvas.delete(item)
-    canvas.delete(task["check"])
-    canvas.delete(task["box"])
-    canvas.delete(task["star"])
-
-    tasks.remove(task)
-    save_tasks()
-
-    # re-layout tasks and pinned post-its
-    for i, t in enumerate(tasks):
-        new_y = LINE_START_Y + i * LINE_HEIGHT
-        t["y"] = new_y
-
-        canvas.coords(t["box"], 35, new_y - 10, 50, new_y + 5)
-        canvas.coords(t["check"], 37, new_y - 2, 43, new_y + 3, 48, new_y - 7)
-
-        for j, ch_item in enumerate(t["chars"]):
-            canvas.coords(ch_item, TEXT_START_X + j * CHAR_WIDTH, new_y - 2)
-
-        star_x = max(200, canvas.winfo_width() * 0.72 or 480)
-        canvas.coords(t["star"], star_x, new_y - 2)
-
-        # move post-its pinned to this task
-        for p in postits:
-            if p.get("pinned_task") is t:
-                x1, y1, x2, y2 = canvas.coords(p["rect"])
-                target_y = new_y - 40
-                dy = target_y - y1
-                for obj in (p["shadow"], p["rect"], p["text"], p["delete"], p["pin"]):
-                    canvas.move(obj, 0, dy)
-
-
-# =========================
-# NOTEBOOK LINES + MARGIN
-# =========================
-def redraw_lines(event=None):
-    canvas.delete("notepad_line")
-    width = canvas.winfo_width()
-
-    # red margin on the left
-    canvas.create_line(
-        60, LINE_START_Y - 40, 60, canvas.winfo_height() - 10,
-        fill=COLORS["LINE_MARGIN"],
-        width=2,
-        tags="notepad_line"
-    )
-
-    # horizontal blue lines
-    for i in range(LINE_START_Y, canvas.winfo_height(), LINE_HEIGHT):
-        canvas.create_line(
-            20, i, width - 20, i,
-            fill=COLORS["LINE_BLUE"],
-            tags="notepad_line"
-        )
-
-
-# =========================
-# TYPING DIRECTLY ON PAPER
-# =========================
-def clear_current_input():
-    global current_text, current_text_items, caret, caret_active, current_y
-    for item in current_text_items:
-        canvas.delete(item)
-    current_text_items.clear()
-
-    if caret:
-        canvas.delete(caret)
-
-    caret = None
-    current_text = ""
-    current_y = None
-    caret_active = False
-
-
-def blink_caret():
-    if not caret_active or caret is None:
-        return
-    state = canvas.itemcget(caret, "state")
-    canvas.itemconfig(caret, state="hidden" if state == "normal" else "normal")
-    window.after(500, blink_caret)
-
-
-def start_typing():
-    global current_text, caret_active, current_y, caret
-    clear_current_input()
-
-    current_y = LINE_START_Y + len(tasks) * LINE_HEIGHT
-    caret_active = True
-
-    caret = canvas.create_line(
-        TEXT_START_X, current_y - 10,
-        TEXT_START_X, current_y + 5,
-        width=2,
-        fill=COLORS["FG_TEXT"]
-    )
-    blink_caret()
-
-
-def on_key_press(event):
-    global current_text, current_text_items, caret, current_y, caret_active
-
-    if not caret_active or current_y is None:
-        return
-
-    if event.keysym == "Return":
-        txt = current_text.strip()
-        if txt:
-            create_task(txt)
-            save_tasks()
-        clear_current_input()
-        redraw_lines()
-        on_search_change()
-        return
-
-    if event.keysym == "BackSpace":
-        if current_text_items:
-            last = current_text_items.pop()
-            canvas.delete(last)
-            current_text = current_text[:-1]
-            new_x = TEXT_START_X + len(current_text_items) * CHAR_WIDTH
-            canvas.coords(caret, new_x, current_y - 10, new_x, current_y + 5)
-        return
-
-    if not event.char.isprintable():
-        return
-
-    ch = event.char
-    x = TEXT_START_X + len(current_text_items) * CHAR_WIDTH
-    y = current_y - 2
-
-    item = canvas.create_text(
-        x, y,
-        text=ch,
-        anchor="w",
-        font=("Courier New", 14),
-        fill=COLORS["FG_TEXT"]
-    )
-
-    current_text_items.append(item)
-    current_text += ch
-
-    new_x = x + CHAR_WIDTH
-    canvas.coords(caret, new_x, current_y - 10, new_x, current_y + 5)
-
-
-# =========================
-# POST-ITS: DELETE / PIN / DRAG
-# =========================
-def delete_postit(p):
-    for part in (p["shadow"], p["rect"], p["text"], p["delete"], p["pin"]):
-        canvas.delete(part)
-    postits.remove(p)
-
-
-def toggle_pin(p):
-    """Pin to nearest task, or unpin."""
-    if p.get("pinned_task") is None:
-        if not tasks:
-            return
-        x1, y1, x2, y2 = canvas.coords(p["rect"])
-        center_y = (y1 + y2) / 2
-
-        nearest = min(tasks, key=lambda t: abs(t["y"] - center_y))
-        p["pinned_task"] = nearest
-
-        target_y = nearest["y"] - 40
-        dy = target_y - y1
-        for obj in (p["shadow"], p["rect"], p["text"], p["delete"], p["pin"]):
-            canvas.move(obj, 0, dy)
-
-        canvas.itemconfig(p["pin"], fill="red")
-    else:
-        p["pinned_task"] = None
-        canvas.itemconfig(p["pin"], fill="grey")
-
-
-def start_postit_drag(p, event):
-    """Begin dragging a post-it if it is not pinned."""
-    global dragging_postit, last_drag_pos
-    if p.get("pinned_task") is not None:
-        return
-    dragging_postit = p
-    last_drag_pos = (event.x, event.y)
-
-
-def drag_postit_motion(event):
-    global dragging_postit, last_drag_pos
-    if dragging_postit is None:
-        return
-    x, y = event.x, event.y
-    dx = x - last_drag_pos[0]
-    dy = y - last_drag_pos[1]
-    last_drag_pos = (x, y)
-
-    for obj in (dragging_postit["shadow"], dragging_postit["rect"],
-                dragging_postit["text"], dragging_postit["delete"], dragging_postit["pin"]):
-        canvas.move(obj, dx, dy)
-
-
-def end_postit_drag(event):
-    global dragging_postit
-    dragging_postit = None
-
-
-# =========================
-# POST-ITS: CREATE / PLACE
-# =========================
-def create_postit_at(x, y, text, color):
-    shadow = canvas.create_rectangle(
-        x + 4, y + 6, x + 144, y + 126,
-        fill="#c4c4c4", outline="", width=0
-    )
-
-    rect = canvas.create_rectangle(
-        x, y, x + 140, y + 120,
-        fill=color, outline="#E0C96F", width=3
-    )
-    text_id = canvas.create_text(
-        x + 10, y + 10,
-        anchor="nw",
-        text=text,
-        width=120,
-        font=("Segoe UI", 11),
-        fill="#111111"
-    )
-
-    delete_btn = canvas.create_text(
-        x + 130, y + 10,
-        text="✖",
-        font=("Segoe UI", 11),
-        fill="grey"
-    )
-
-    pin_btn = canvas.create_text(
-        x + 120, y + 30,
-        text="📌",
-        font=("Segoe UI", 11),
-        fill="grey"
-    )
-
-    canvas.tag_raise(rect)
-    canvas.tag_raise(text_id)
-    canvas.tag_raise(delete_btn)
-    canvas.tag_raise(pin_btn)
-
-    p = {
-        "shadow": shadow,
-        "rect": rect,
-        "text": text_id,
-        "delete": delete_btn,
-        "pin": pin_btn,
-        "color": color,
-        "pinned_task": None,
-    }
-    postits.append(p)
-
-    # bindings
-    canvas.tag_bind(rect, "<Button-1>", lambda e, p=p: start_postit_drag(p, e))
-    canvas.tag_bind(text_id, "<Button-1>", lambda e, p=p: start_postit_drag(p, e))
-    canvas.tag_bind(delete_btn, "<Button-1>", lambda e, p=p: delete_postit(p))
-    canvas.tag_bind(pin_btn, "<Button-1>", lambda e, p=p: toggle_pin(p))
-
-
-def place_postit_at(x, y, text, color):
-    start_y = y - 30
-    final_y = y
-
-    # shadow (behind)
-    shadow = canvas.create_rectangle(
-        x + 4, start_y + 6, x + 144, start_y + 126,
-        fill="#c4c4c4", outline="", width=0
-    )
-
-    rect = canvas.create_rectangle(
-        x, start_y, x + 140, start_y + 120,
-        fill=color, outline="#E0C96F", width=3
-    )
-    text_id = canvas.create_text(
-        x + 10, start_y + 10,
-        anchor="nw",
-        text=text,
-        width=120,
-        font=("Segoe UI", 11),
-        fill="#111111"
-    )
-
-    delete_btn = canvas.create_text(
-        x + 130, start_y + 10,
-        text="✖",
-        font=("Segoe UI", 11),
-        fill="grey"
-    )
-
-    pin_btn = canvas.create_text(
-        x + 120, start_y + 30,
-        text="📌",
-        font=("Segoe UI", 11),
-        fill="grey"
-    )
-
-    # bring controls on top
-    canvas.tag_raise(rect)
-    canvas.tag_raise(text_id)
-    canvas.tag_raise(delete_btn)
-    canvas.tag_raise(pin_btn)
-
-    # drop animation
-    for _ in range(10):
-        dy = (final_y - start_y) / 10
-        for obj in (shadow, rect, text_id, delete_btn, pin_btn):
-            canvas.move(obj, 0, dy)
-        canvas.update()
-        time.sleep(0.02)
-
-    # small bounce
-    for _ in range(3):
-        for obj in (shadow, rect, text_id, delete_btn, pin_btn):
-            canvas.move(obj, 0, -2)
-        canvas.update()
-        time.sleep(0.02)
-
-    for _ in range(3):
-        for obj in (shadow, rect, text_id, delete_btn, pin_btn):
-            canvas.move(obj, 0, 2)
-        canvas.update()
-        time.sleep(0.02)
-
-    p = {
-        "shadow": shadow,
-        "rect": rect,
-        "text": text_id,
-        "delete": delete_btn,
-        "pin": pin_btn,
-        "color": color,
-        "pinned_task": None,
-    }
-    postits.append(p)
-
-    # bindings
-    canvas.tag_bind(rect, "<Button-1>", lambda e, p=p: start_postit_drag(p, e))
-    canvas.tag_bind(text_id, "<Button-1>", lambda e, p=p: start_postit_drag(p, e))
-    canvas.tag_bind(delete_btn, "<Button-1>", lambda e, p=p: delete_postit(p))
-    canvas.tag_bind(pin_btn, "<Button-1>", lambda e, p=p: toggle_pin(p))
-
-
-# =========================
-# POST-IT PREVIEW (GHOST)
-# =========================
-def create_postit_preview(text):
-    global placing_postit, postit_text_to_place, preview_postit
-
-    if preview_postit:
-        canvas.delete(preview_postit["rect"])
-        canvas.delete(preview_postit["text"])
-        preview_postit = None
-
-    placing_postit = True
-    postit_text_to_place = text
-
-    x, y = 150, 150
-
-    rect = canvas.create_rectangle(
-        x, y, x + 140, y + 120,
-        fill="#FFFDE1",
-        outline="#E0C96F",
-        width=2
-    )
-    text_id = canvas.create_text(
-        x + 10,
-        y + 10,
-        anchor="nw",
-        text=text,
-        width=120,
-        font=("Segoe UI", 11),
-        fill="#555555"
-    )
-
-    preview_postit = {"rect": rect, "text": text_id}
-
-
-def open_postit_input():
-    """Popup to type a post-it and choose color."""
-    popup = tk.Toplevel(window)
-    popup.title("New Post-it")
-    popup.geometry("300x200")
-    popup.configure(bg=COLORS["BG_WINDOW"])
-
-    tk.Label(popup, text="Write your Post-it:", fg=COLORS["FG_TEXT"], bg=COLORS["BG_WINDOW"]).pack(pady=5)
-    entry = tk.Entry(popup, width=30)
-    entry.pack(pady=5)
-
-    tk.Label(popup, text="Color:", fg=COLORS["FG_TEXT"], bg=COLORS["BG_WINDOW"]).pack(pady=5)
-
-    color_var = tk.StringVar(popup)
-    color_var.set("Yellow")
-    tk.OptionMenu(popup, color_var, *POSTIT_COLORS.keys()).pack(pady=5)
-
-    def confirm():
-        global postit_color_to_place
-        txt = entry.get().strip()
-        if txt:
-            postit_color_to_place = POSTIT_COLORS[color_var.get()]
-            create_postit_preview(txt)
-        popup.destroy()
-
-    tk.Button(popup, text="Add", command=confirm).pack(pady=10)
-
-
-def on_mouse_move(event):
-    """Move ghost preview while placing."""
-    if not placing_postit or preview_postit is None:
-        return
-
-    x, y = event.x, event.y
-    max_w = canvas.winfo_width() - 140
-    max_h = canvas.winfo_height() - 120
-
-    x = max(0, min(x, max_w))
-    y = max(0, min(y, max_h))
-
-    canvas.coords(preview_postit["rect"], x, y, x + 140, y + 120)
-    canvas.coords(preview_postit["text"], x + 10, y + 10)
-
-
-def on_right_click(event):
-    """Right-click to stick the post-it."""
-    global placing_postit, postit_text_to_place, preview_postit
-
-    if not placing_postit or preview_postit is None:
-        return
-
-    x1, y1, x2, y2 = canvas.coords(preview_postit["rect"])
-    text = postit_text_to_place
-    color = postit_color_to_place
-
-    canvas.delete(preview_postit["rect"])
-    canvas.delete(preview_postit["text"])
-    preview_postit = None
-
-    placing_postit = False
-    postit_text_to_place = ""
-
-    threading.Thread(
-        target=place_postit_at,
-        args=(x1, y1, text, color),
-        daemon=True
-    ).start()
-
-
-# =========================
-# SEARCH BAR + HIGHLIGHT
-# =========================
-def clear_search(event=None):
-    """Clear search and reset text colors."""
-    search_entry.delete(0, tk.END)
-    for t in tasks:
-        for ch in t["chars"]:
-            canvas.itemconfig(ch, fill=COLORS["FG_TEXT"], font=("Courier New", 14))
-
-
-def on_search_change(event=None):
-    """Highlight matching tasks by bright text, dim others."""
-    query = search_entry.get().strip().lower()
-
-    for t in tasks:
-        text_lower = t["text"].lower()
-        if query and query in text_lower:
-            # highlight match
-            for ch_item in t["chars"]:
-                canvas.itemconfig(ch_item, fill="#ffd300", font=("Courier New", 14, "bold"))
-        else:
-            # dim or reset
-            color = COLORS["DIM_TEXT"] if query else COLORS["FG_TEXT"]
-            for ch_item in t["chars"]:
-                canvas.itemconfig(ch_item, fill=color, font=("Courier New", 14))
-
-
-# =========================
-# CLICK HANDLING / LOAD / LAYOUT
-# =========================
-def on_canvas_click(event):
-    if placing_postit:
-        return
-
-    # click off search
-    clear_search()
-
-    # if clicking on a post-it element, don't start typing
-    item = canvas.find_withtag("current")
-    if item:
-        for p in postits:
-            if item[0] in (p["shadow"], p["rect"], p["text"], p["delete"], p["pin"]):
-                return
-
-    next_y = LINE_START_Y + len(tasks) * LINE_HEIGHT
-    if event.y >= next_y - 15:
-        start_typing()
-
-
-def load_tasks():
-    try:
-        with open(FILENAME, "r", encoding="utf-8") as f:
-            for line in f:
-                parts = line.strip().split("||")
-                if len(parts) == 2:
-                    text, done = parts
-                    priority = 0
-                elif len(parts) == 3:
-                    text, done, priority = parts
-                    priority = int(priority)
-                else:
-                    continue
-                create_task(text, done == "True", priority)
-    except FileNotFoundError:
-        pass
-
-
-def clear_current_page_ui():
-    global tasks, completed_tasks, postits
-    # clear tasks
-    for t in tasks:
-        for item in t["chars"]:
-            canvas.delete(item)
-        canvas.delete(t["check"])
-        canvas.delete(t["box"])
-        canvas.delete(t["star"])
-    tasks = []
-
-    # clear completed
-    completed_canvas.delete("all")
-    completed_tasks = []
-    completed_canvas.create_text(
-        10, 20,
-        anchor="w",
-        text="Completed Tasks",
-        font=("Segoe UI", 14, "bold"),
-        fill=COLORS["FG_TEXT"]
-    )
-
-    # clear post-its
-    for p in postits:
-        for part in (p["shadow"], p["rect"], p["text"], p["delete"], p["pin"]):
-            canvas.delete(part)
-    postits = []
-
-    clear_current_input()
-    redraw_lines()
-
-
-# =========================
-# TABS: SAVE / LOAD / SWITCH
-# =========================
-def save_current_tab_model():
-    if current_tab is None:
-        return
-
-    model = {"tasks": [], "completed": [], "postits": []}
-
-    for t in tasks:
-        model["tasks"].append({
-            "text": t["text"],
-            "done": t["done"],
-            "priority": t["priority"],
-        })
-
-    for c in completed_tasks:
-        model["completed"].append({
-            "text": c["text"],
-            "priority": c["priority"],
-        })
-
-    for p in postits:
-        x1, y1, x2, y2 = canvas.coords(p["rect"])
-        txt = canvas.itemcget(p["text"], "text")
-        model["postits"].append({
-            "text": txt,
-            "color": p["color"],
-            "x": x1,
-            "y": y1,
-        })
-
-    tabs[current_tab] = model
-
-
-def load_tab_model(name):
-    global current_tab
-    clear_current_page_ui()
-
-    model = tabs.get(name, {"tasks": [], "completed": [], "postits": []})
-
-    for tmodel in model["tasks"]:
-        create_task(tmodel["text"], tmodel["done"], tmodel["priority"])
-
-    for cmodel in model["completed"]:
-        add_completed_task(cmodel["text"], cmodel["priority"])
-
-    for pmodel in model["postits"]:
-        create_postit_at(pmodel["x"], pmodel["y"], pmodel["text"], pmodel["color"])
-
-    current_tab = name
-    refresh_tab_bar()
-
-
-def switch_tab(name):
-    global current_tab
-    if current_tab == name:
-        return
-
-    save_current_tab_model()
-
-    if name not in tabs:
-        tabs[name] = {"tasks": [], "completed": [], "postits": []}
-
-    load_tab_model(name)
-
-
-def add_new_tab():
-    idx = len(tabs) + 1
-    name = f"Page {idx}"
-    tabs[name] = {"tasks": [], "completed": [], "postits": []}
-    switch_tab(name)
-
-
-def refresh_tab_bar():
-    if tab_frame is None:
-        return
-
-    for w in tab_frame.winfo_children():
-        w.destroy()
-
-    for name in tabs.keys():
-        is_active = (name == current_tab)
-        btn = tk.Button(
-            tab_frame,
-            text=name,
-            relief="sunken" if is_active else "flat",
-            bg="#dddddd" if is_active else "#cccccc",
-            padx=8,
-            pady=1,
-            command=lambda n=name: switch_tab(n)
-        )
-        btn.pack(side="left", padx=(0, 2))
-
-    plus_btn = tk.Button(
-        tab_frame,
-        text="+",
-        relief="flat",
-        bg="#cccccc",
-        padx=6,
-        pady=1,
-        command=add_new_tab
-    )
-    plus_btn.pack(side="left")
-
-
-def init_tabs():
-    global current_tab
-    if not tabs:
-        tabs["Page 1"] = {"tasks": [], "completed": [], "postits": []}
-    current_tab = "Page 1"
-    save_current_tab_model()
-    refresh_tab_bar()
-
-
-def update_layout(event=None):
-    """Resize left (notepad) and right (completed) areas."""
-    W = window.winfo_width()
-    H = window.winfo_height()
-
-    note_w = int(W * NOTE_WIDTH_RATIO)
-    comp_w = W - note_w
-
-    canvas.place(x=0, y=45, width=note_w, height=H - 55)
-    completed_canvas.place(x=note_w, y=45, width=comp_w, height=H - 55)
-
-    if cleanup_button:
-        cleanup_button.place(x=note_w - 140, y=10)
-
-    redraw_lines()
-
-    star_x = max(200, canvas.winfo_width() * 0.72 or 480)
-    for t in tasks:
-        canvas.coords(t["star"], star_x, t["y"] - 2)
-
-
-# =========================
-# DARK / LIGHT SLIDER TOGGLE
-# =========================
-def slide_toggle(event=None):
-    global current_theme
-    if toggle_canvas is None:
-        return
-
-    if current_theme == "light":
-        # slide right
-        for _ in range(10):
-            toggle_canvas.move(toggle_knob, 2, 0)
-            toggle_canvas.update()
-            time.sleep(0.01)
-        toggle_canvas.itemconfig(toggle_bg, fill="#555555")
-        toggle_canvas.itemconfig(toggle_knob, fill="#dddddd")
-        current_theme = "dark"
-    else:
-        # slide left
-        for _ in range(10):
-            toggle_canvas.move(toggle_knob, -2, 0)
-            toggle_canvas.update()
-            time.sleep(0.01)
-        toggle_canvas.itemconfig(toggle_bg, fill="#cccccc")
-        toggle_canvas.itemconfig(toggle_knob, fill="#ffffff")
-        current_theme = "light"
-
-    apply_theme()
-
-
-# =========================
-# AI CLEANUP BUTTON
-# =========================
-def cleanup_notes():
-    items_text = []
-
-    for t in tasks:
-        status = "done" if t["done"] else "todo"
-        items_text.append(f"- [{status}] {t['text']} (priority {t['priority']})")
-
-    for c in completed_tasks:
-        items_text.append(f"- [done] {c['text']} (priority {c['priority']})")
-
-    for p in postits:
-        txt = canvas.itemcget(p["text"], "text")
-        items_text.append(f"- [note] {txt}")
-
-    if not items_text:
-        return
-
-    prompt = (
-        "You are cleaning up a messy personal notepad.\n"
-        "Here are the current items (tasks + notes):\n" +
-        "\n".join(items_text) +
-        "\n\nReturn a cleaned-up, organized list of TASKS ONLY.\n"
-        "Rules:\n"
-        "- Remove duplicates and vague items.\n"
-        "- Merge similar items.\n"
-        "- Keep it concise.\n"
-        "- One task per line.\n"
-        "- Do NOT number them.\n"
-        "- Just output the task lines, nothing else.\n"
-    )
-
-    client = openai.OpenAI(api_key="YOUR_API_KEY_HERE")
-
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4.1-mini",
-            messages=[
-                {"role": "system", "content": "You clean and organize to-do lists."},
-                {"role": "user", "content": prompt},
-            ],
-        )
-        cleaned = response.choices[0].message.content.strip()
-    except Exception as e:
-        cleaned = f"Error calling AI: {e}"
-
-    popup = tk.Toplevel(window)
-    popup.title("AI Cleaned Tasks")
-    popup.geometry("400x400")
-
-    tk.Label(popup, text="Review and edit the cleaned tasks:", anchor="w").pack(
-        pady=5, padx=10, fill="x"
-    )
-
-    text = tk.Text(popup, wrap="word")
-    text.pack(fill="both", expand=True, padx=10, pady=5)
-    text.insert("1.0", cleaned)
-
-    def apply_changes():
-        lines = [line.strip() for line in text.get("1.0", "end").splitlines() if line.strip()]
-        clear_current_page_ui()
-        for line in lines:
-            create_task(line, done=False, priority=0)
-        save_tasks()
-        save_current_tab_model()
-        popup.destroy()
-
-    btn_frame = tk.Frame(popup)
-    btn_frame.pack(pady=8)
-
-    tk.Button(btn_frame, text="Apply", command=apply_changes).pack(side="left", padx=5)
-    tk.Button(btn_frame, text="Cancel", command=popup.destroy).pack(side="left", padx=5)
-
-
-# =========================
-# AI CHAT PANEL
-# =========================
-def open_ai_panel():
-    """Resizable AI chat panel with input bar and arrow button."""
-    if hasattr(window, "ai_panel") and window.ai_panel.winfo_exists():
-        window.ai_panel.lift()
-        return
-
-    panel = tk.Toplevel(window)
-    panel.title("AI Assistant")
-    panel.geometry("420x480")
-    panel.minsize(320, 320)
-    window.ai_panel = panel
-
-    panel.grid_rowconfigure(0, weight=1)
-    panel.grid_columnconfigure(0, weight=1)
-
-    chat_frame = tk.Frame(panel, bg="#f3f3f3")
-    chat_frame.grid(row=0, column=0, sticky="nsew")
-
-    scroll_y = tk.Scrollbar(chat_frame)
-    scroll_y.pack(side="right", fill="y")
-
-    chat_log = tk.Text(
-        chat_frame,
-        wrap="word",
-        state="disabled",
-        bg="#ffffff",
-        fg="#222222",
-        font=("Segoe UI", 10),
-        yscrollcommand=scroll_y.set,
-        bd=0,
-        padx=10,
-        pady=10
-    )
-    chat_log.pack(side="left", fill="both", expand=True)
-    scroll_y.config(command=chat_log.yview)
-
-    chat_log.tag_configure("user", foreground="#1a73e8", justify="right")
-    chat_log.tag_configure("ai", foreground="#222222", justify="left")
-
-    input_frame = tk.Frame(panel, bg="#f3f3f3")
-    input_frame.grid(row=1, column=0, sticky="ew", padx=8, pady=8)
-    panel.grid_rowconfigure(1, weight=0)
-
-    entry = tk.Entry(
-        input_frame,
-        font=("Segoe UI", 10),
-        relief="solid",
-        bd=1
-    )
-    entry.pack(side="left", fill="x", expand=True, ipady=4, padx=(0, 6))
-
-    send_btn = tk.Button(
-        input_frame,
-        text="➤",
-        font=("Segoe UI", 12, "bold"),
-        width=3,
-        relief="flat",
-        bg="#e0e0e0",
-        activebackground="#d0d0d0"
-    )
-    send_btn.pack(side="right")
-
-    def send_message(event=None):
-        user_msg = entry.get().strip()
-        if not user_msg:
-            return
-        entry.delete(0, tk.END)
-
-        # show user message
-        chat_log.config(state="normal")
-        chat_log.insert("end", f"You: {user_msg}\n\n", "user")
-        chat_log.config(state="disabled")
-        chat_log.see("end")
-
-        # collect context
-        notes_context = []
-        for t in tasks:
-            notes_context.append(f"[Task] {t['text']}")
-        for c in completed_tasks:
-            notes_context.append(f"[Done] {c['text']}")
-
-        # --- OpenAI call (insert your key locally) ---
-        client = openai.OpenAI(api_key="YOUR_API_KEY_HERE")
-
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4.1-mini",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": (
-                            "You are an assistant living inside a clean notebook "
-                            "to-do app. Help the user plan, organize and reflect "
-                            "using their tasks and notes."
-                        ),
-                    },
-                    {
-                        "role": "system",
-                        "content": "Here are the user's notes and tasks:\n"
-                                   + "\n".join(notes_context),
-                    },
-                    {"role": "user", "content": user_msg},
-                ],
-            )
-            ai_answer = response.choices[0].message.content
-        except Exception as e:
-            ai_answer = f"(AI error: {e})"
-
-        chat_log.config(state="normal")
-        chat_log.insert("end", f"AI: {ai_answer}\n\n", "ai")
-        chat_log.config(state="disabled")
-        chat_log.see("end")
-
-    entry.bind("<Return>", send_message)
-    send_btn.config(command=send_message)
-
-
-# =========================
-# WINDOW SETUP
-# =========================
-window = tk.Tk()
-window.title("Notepad To-Do")
-window.geometry("950x700")
-window.minsize(650, 450)
-window.configure(bg=COLORS["BG_WINDOW"])
-
-canvas = tk.Canvas(window, bg=COLORS["BG_CANVAS"], highlightthickness=0)
-completed_canvas = tk.Canvas(window, bg=COLORS["BG_COMPLETED"], highlightthickness=0)
-
-completed_canvas.create_text(
-    10, 20,
-    anchor="w",
-    text="Completed Tasks",
-    font=("Segoe UI", 14, "bold"),
-    fill=COLORS["FG_TEXT"]
-)
-
-# top controls
-postit_button = tk.Button(
-    window,
-    text="Add Post-it",
-    command=open_postit_input,
-    bg=COLORS["BTN_BG"],
-    fg=COLORS["BTN_FG"],
-    relief="flat",
-    padx=10,
-    pady=2
-)
-postit_button.place(x=70, y=10)
-
-# theme toggle (top-left)
-toggle_frame = tk.Frame(window, bg=COLORS["BG_WINDOW"])
-toggle_frame.place(x=10, y=10)
-
-toggle_canvas = tk.Canvas(toggle_frame, width=50, height=24, bg=COLORS["BG_WINDOW"], highlightthickness=0)
-toggle_canvas.pack()
-
-toggle_bg = toggle_canvas.create_rectangle(2, 2, 48, 22, fill="#cccccc", outline="")
-toggle_knob = toggle_canvas.create_oval(2, 2, 22, 22, fill="#ffffff", outline="")
-
-toggle_canvas.bind("<Button-1>", slide_toggle)
-
-# tabs frame
-tab_frame = tk.Frame(window, bg=COLORS["BG_WINDOW"])
-tab_frame.place(x=180, y=8)
-
-search_label = tk.Label(window, text="Search:", fg=COLORS["FG_TEXT"], bg=COLORS["BG_WINDOW"])
-search_label.place(x=360, y=12)
-search_entry = tk.Entry(window, width=25)
-search_entry.place(x=420, y=12)
-search_entry.bind("<KeyRelease>", on_search_change)
-
-cleanup_button = tk.Button(
-    window,
-    text="Clean Up Notes",
-    bg=COLORS["BTN_BG"],
-    fg=COLORS["BTN_FG"],
-    relief="flat",
-    padx=10,
-    pady=2,
-    command=cleanup_notes
-)
-
-ai_button = tk.Button(
-    window,
-    text="🤖",
-    font=("Segoe UI", 13),
-    command=open_ai_panel,
-    bg=COLORS["BTN_BG"],
-    fg=COLORS["BTN_FG"],
-    relief="flat"
-)
-ai_button.place(relx=0.97, rely=0.97, anchor="se")
-
-# bindings
-window.bind("<Configure>", update_layout)
-window.bind("<Key>", on_key_press)
-window.bind("<Escape>", clear_search)
-
-canvas.bind("<Button-1>", on_canvas_click)
-canvas.bind("<Motion>", on_mouse_move)
-canvas.bind("<Button-3>", on_right_click)
-canvas.bind("<B1-Motion>", drag_postit_motion)
-canvas.bind("<ButtonRelease-1>", end_postit_drag)
-
-# init
-update_layout()
-apply_theme()
-load_tasks()
-init_tabs()
-on_search_change()
-
-window.mainloop()
+import tkinter as tk
+import atexit
+import hashlib
+import json
+import os
+import queue
+import time
+import threading
+import random
+import openai  # pip install openai
+
+from todomodel import (
+    LINE_HEIGHT, LINE_START_Y, ContextBuilder, Notebook, atomic_write,
+    fuzzy_match_score, row_y, words
+)
+
+# AI assistant (insert your key locally or set OPENAI_API_KEY)
+AI_MODEL = "gpt-4.1-mini"
+AI_API_KEY = os.environ.get("OPENAI_API_KEY", "YOUR_API_KEY_HERE")
+AI_BASE_URL = os.environ.get("OPENAI_BASE_URL")  # None: the official endpoint
+AI_TIMEOUT = 60     # seconds before a request is given up
+AI_POLL_MS = 50
+AI_CACHE_DIR = "Tasks.ai-cache"   # cleanup answers, one file per request hash
+AI_CACHE_MAX_BYTES = 2_000_000    # least recently used answers beyond this are dropped
+AI_CONTEXT_TOKENS = 3000          # budget for the notes sent with a chat message
+
+# =========================
+# THEME SYSTEM
+# =========================
+current_theme = "light"
+
+THEMES = {
+    "light": {
+        "BG_WINDOW": "#f0f0f0",
+        "BG_CANVAS": "#fdfcf7",
+        "BG_COMPLETED": "#f5f5f5",
+        "FG_TEXT": "#222222",
+        "FG_SUBTLE": "#999999",
+        "LINE_BLUE": "#d3e4ff",
+        "LINE_MARGIN": "#ff9999",
+        "BTN_BG": "#ffffff",
+        "BTN_FG": "#333333",
+        "DIM_TEXT": "#bbbbbb",
+    },
+    "dark": {
+        "BG_WINDOW": "#1e1e1e",
+        "BG_CANVAS": "#252526",
+        "BG_COMPLETED": "#1e1e1e",
+        "FG_TEXT": "#f5f5f5",
+        "FG_SUBTLE": "#777777",
+        "LINE_BLUE": "#3a4d6e",
+        "LINE_MARGIN": "#a65c5c",
+        "BTN_BG": "#3a3d41",
+        "BTN_FG": "#f5f5f5",
+        "DIM_TEXT": "#555555",
+    }
+}
+
+COLORS = THEMES[current_theme].copy()
+
+# =========================
+# GLOBAL STATE
+# =========================
+startup_started = time.perf_counter()  # startup timings (see load_tasks)
+first_paint_ms = None
+
+notebook = Notebook()  # pages and their files (todomodel.py)
+page = None            # the Page on screen; the canvas mirrors its events
+page_tag = None        # canvas tag of the items drawn for that page
+rendered_pages = {}    # Page -> scroll offset, least recently shown first
+archive_views = {}     # Page -> {"drawn_from", "pages"}: archived entries drawn so far
+
+# virtualized task rows
+visible_rows = {}     # task index -> row slot showing it
+row_pool = []         # hidden row slots ready for reuse
+row_items = {}        # canvas item -> (row slot, part), for on_row_press
+
+# search
+search_query = ""
+search_matches = set()  # ids of tasks matching search_query
+fuzzy_search = False    # typo-tolerant, top FUZZY_MATCHES only (click the label)
+search_hits = []        # hits listed under the search box (all pages)
+search_results_job = None  # pending refresh of that list while typing
+search_read_job = None  # next step of reading an unopened page for that list
+
+# running animations (see animate)
+animations = []
+animation_job = None
+toggle_animation = None
+layout_job = None     # pending coalesced layout pass
+
+# ruled notebook lines
+ruled_lines = {}      # line index -> line item ruling it
+free_lines = []       # hidden line items ready for reuse
+margin_line = None
+lines_width = None    # canvas width the visible lines are sized for
+
+# eraser crumb particles
+crumb_items = []      # every crumb oval created so far (<= PARTICLE_BUDGET)
+free_crumbs = []      # hidden crumb ovals ready for reuse
+live_crumbs = []      # [item, age] of crumbs currently falling
+crumb_animation = None
+
+# background AI requests
+ai_cache_lock = threading.Lock()
+context_builders = {}  # Page -> ContextBuilder keeping its chat context current
+ai_results = queue.Queue()
+ai_pending = []
+ai_poll_job = None
+cleanup_request = None
+
+# typing state
+current_text = ""
+current_text_item = None
+caret = None
+caret_active = False
+current_y = None
+
+# post-it placement state
+placing_postit = False
+postit_text_to_place = ""
+postit_color_to_place = "#FFF9B0"
+preview_postit = None  # {"rect": ..., "text": ...}
+
+# post-it items
+postit_items = {}      # canvas item -> post-it it belongs to (placed notes only)
+
+# dragging post-its
+dragging_postit = None
+last_drag_pos = (0, 0)
+drag_pending = [0, 0]  # motion not yet applied to the canvas
+drag_job = None
+
+CHAR_WIDTH = 10
+TASK_FONT = ("Courier New", 14)
+TASK_FONT_BOLD = ("Courier New", 14, "bold")
+TEXT_START_X = 70
+
+SCROLLBAR_WIDTH = 14
+
+FRAME_MS = 16        # animation frame interval (~60 fps)
+MAX_ANIMATIONS = 8   # beyond this the oldest animations are fast-forwarded
+PARTICLE_BUDGET = 90  # eraser crumbs alive at once
+CRUMB_LIFETIME = 15   # frames a crumb falls before it is recycled
+RENDER_CACHE_PAGES = 4  # pages whose canvas items survive a tab switch
+COMPLETED_ROW_HEIGHT = 25
+ARCHIVE_PAGE_SIZE = 50  # archived completed tasks read and drawn at a time
+SEARCH_RESULTS = 50     # hits listed by a search over all pages
+FUZZY_MATCHES = 20      # best rows a fuzzy search highlights
+SEARCH_REFRESH_MS = 250  # typing pause before the all-pages list is refreshed
+
+NOTE_WIDTH_RATIO = 0.75      # writing area
+COMPLETE_WIDTH_RATIO = 0.25  # completed area
+
+POSTIT_COLORS = {
+    "Yellow": "#FFF9B0",
+    "Pink":   "#FFD1DC",
+    "Blue":   "#D0E8FF",
+    "Green":  "#E4FFD1",
+    "Purple": "#EAD9FF",
+}
+
+# widgets (assigned later)
+window = None
+canvas = None
+completed_canvas = None
+postit_button = None
+search_label = None
+search_entry = None
+search_results = None
+ai_button = None
+toggle_canvas = None
+toggle_bg = None
+toggle_knob = None
+tab_frame = None
+cleanup_button = None
+scrollbar = None
+
+
+# =========================
+# THEME APPLY
+# =========================
+def apply_theme():
+    global COLORS
+    COLORS = THEMES[current_theme].copy()
+
+    if window is None:
+        return
+
+    window.configure(bg=COLORS["BG_WINDOW"])
+    if canvas:
+        canvas.configure(bg=COLORS["BG_CANVAS"])
+    if completed_canvas:
+        completed_canvas.configure(bg=COLORS["BG_COMPLETED"])
+
+    if postit_button:
+        postit_button.configure(bg=COLORS["BTN_BG"], fg=COLORS["BTN_FG"])
+    if search_label:
+        search_label.configure(bg=COLORS["BG_WINDOW"], fg=COLORS["FG_TEXT"])
+    if search_entry:
+        search_entry.configure(
+            bg=COLORS["BG_CANVAS"],
+            fg=COLORS["FG_TEXT"],
+            insertbackground=COLORS["FG_TEXT"],
+        )
+    if search_results:
+        search_results.configure(bg=COLORS["BG_CANVAS"], fg=COLORS["FG_TEXT"])
+    if ai_button:
+        ai_button.configure(bg=COLORS["BTN_BG"], fg=COLORS["BTN_FG"])
+    if cleanup_button:
+        cleanup_button.configure(bg=COLORS["BTN_BG"], fg=COLORS["BTN_FG"])
+
+    # Themed canvas items carry a tag per color role, so recoloring is one
+    # itemconfig per tag class however long the page is (pooled and hidden
+    # items included). Stars and post-its keep their own colors.
+    if canvas:
+        canvas.itemconfig("task_box", outline=COLORS["FG_SUBTLE"])
+        canvas.itemconfig("task_check||text_normal||typing", fill=COLORS["FG_TEXT"])
+        canvas.itemconfig("text_dim", fill=COLORS["DIM_TEXT"])
+        canvas.itemconfig("ruled", fill=COLORS["LINE_BLUE"])
+        canvas.itemconfig("margin", fill=COLORS["LINE_MARGIN"])
+    if completed_canvas:
+        completed_canvas.itemconfig(
+            "completed_title||completed_text||strike", fill=COLORS["FG_TEXT"]
+        )
+
+
+# =========================
+# ANIMATION ENGINE
+# =========================
+# Every animation is a generator that does one frame of work per next().
+# A single window.after loop advances all of them, so nothing sleeps or
+# touches Tk from another thread.
+def animate(steps, on_finish=None, capped=True):
+    """Start a tween; returns a handle usable with finish_animation()."""
+    global animation_job
+    anim = {"steps": steps, "on_finish": on_finish, "capped": capped}
+    animations.append(anim)
+
+    # too many at once: jump the oldest ones to their last frame
+    capped_anims = [a for a in animations if a["capped"]]
+    for old in capped_anims[:max(0, len(capped_anims) - MAX_ANIMATIONS)]:
+        finish_animation(old)
+
+    if animation_job is None:
+        animation_job = window.after(FRAME_MS, animation_tick)
+    return anim
+
+
+def end_animation(anim):
+    if anim in animations:
+        animations.remove(anim)
+        if anim["on_finish"]:
+            anim["on_finish"]()
+
+
+def finish_animation(anim):
+    """Fast-forward one animation: run its remaining frames right now."""
+    if anim in animations:
+        for _ in anim["steps"]:
+            pass
+        end_animation(anim)
+
+
+def fast_forward_animations():
+    while animations:
+        finish_animation(animations[0])
+
+
+def animation_tick():
+    global animation_job
+    animation_job = None
+
+    for anim in list(animations):
+        if anim not in animations:
+            continue  # finished by another animation's callback
+        try:
+            next(anim["steps"])
+        except StopIteration:
+            end_animation(anim)
+
+    if animations and animation_job is None:
+        animation_job = window.after(FRAME_MS, animation_tick)
+
+
+# =========================
+# SAVING
+# =========================
+def on_close():
+    """Flush pending saves before the window goes away."""
+    fast_forward_animations()
+    notebook.flush()
+    window.destroy()
+
+
+# =========================
+# TASKS: ROWS / ERASE / COMPLETE
+# =========================
+# ---------------- VIRTUALIZED TASK ROWS -----------------
+def star_x():
+    return max(200, canvas.winfo_width() * 0.72 or 480)
+
+
+def stars_text(priority):
+    return "★" * priority + "☆" * (3 - priority)
+
+
+def new_row():
+    """Create the (hidden) canvas items for one reusable row slot."""
+    row = {"task": None, "index": None}
+
+    # checkbox
+    row["box"] = canvas.create_rectangle(
+        35, -20, 50, -5,
+        outline=COLORS["FG_SUBTLE"], width=2, state="hidden", tags=("row", "task_box")
+    )
+
+    # checkmark (only shown for done tasks)
+    row["check"] = canvas.create_line(
+        37, -20, 43, -15, 48, -25,
+        width=2, fill=COLORS["FG_TEXT"], state="hidden", tags=("row", "task_check")
+    )
+
+    # the whole line is a single text item
+    row["item"] = canvas.create_text(
+        TEXT_START_X, -20,
+        text="",
+        anchor="w",
+        font=TASK_FONT,
+        fill=COLORS["FG_TEXT"],
+        state="hidden",
+        tags=("row", "task_text", "text_normal")
+    )
+
+    # priority stars
+    row["star"] = canvas.create_text(
+        star_x(), -20,
+        text="",
+        anchor="e",
+        font=TASK_FONT,
+        fill="#e6b800",
+        state="hidden",
+        tags="row"
+    )
+
+    for part in ("box", "check", "item", "star"):
+        row_items[row[part]] = (row, part)
+    return row
+
+
+def bind_row(row, index):
+    """Show page.tasks[index] in the given row slot."""
+    task = page.tasks[index]
+    old = row["task"]
+    if old is not None and old is not task and old.row is row:
+        old.row = None
+    row["task"] = task
+    row["index"] = index
+    task.row = row
+
+    y = row_y(index)
+    style, fill, font = task_text_style(task)
+    canvas.coords(row["box"], 35, y - 10, 50, y + 5)
+    canvas.coords(row["check"], 37, y - 2, 43, y + 3, 48, y - 7)
+    canvas.coords(row["item"], TEXT_START_X, y - 2)
+    canvas.coords(row["star"], star_x(), y - 2)
+    canvas.itemconfig(row["box"], state="normal")
+    canvas.itemconfig(row["check"], state="normal" if task.done else "hidden")
+    canvas.itemconfig(
+        row["item"],
+        text=task.text, fill=fill, font=font, tags=("row", "task_text", style),
+        state="normal"
+    )
+    canvas.itemconfig(row["star"], text=stars_text(task.priority), state="normal")
+
+
+def release_row(row):
+    """Hide a row slot and return it to the pool."""
+    if row["task"] is not None and row["task"].row is row:
+        row["task"].row = None
+    row["task"] = None
+    row["index"] = None
+    for part in ("box", "check", "item", "star"):
+        canvas.itemconfig(row[part], state="hidden")
+    row_pool.append(row)
+
+
+def visible_range():
+    """Indices [first, last) of the task rows inside the viewport."""
+    top = canvas.canvasy(0)
+    bottom = top + canvas.winfo_height()
+    first = max(0, int(-(-(top - 5 - LINE_START_Y) // LINE_HEIGHT)))
+    last = min(len(page.tasks), int((bottom + 10 - LINE_START_Y) // LINE_HEIGHT) + 1)
+    return first, max(first, last)
+
+
+def update_scrollregion():
+    height = max(canvas.winfo_height(), row_y(len(page.tasks)) + 2 * LINE_HEIGHT)
+    canvas.configure(scrollregion=(0, 0, canvas.winfo_width(), height))
+
+
+def render_rows():
+    """Materialize rows entering the viewport and recycle rows leaving it."""
+    update_scrollregion()
+    first, last = visible_range()
+
+    for index in list(visible_rows):
+        if not first <= index < last:
+            release_row(visible_rows.pop(index))
+
+    for index in range(first, last):
+        if index not in visible_rows:
+            row = row_pool.pop() if row_pool else new_row()
+            bind_row(row, index)
+            visible_rows[index] = row
+
+
+def release_all_rows():
+    for row in visible_rows.values():
+        release_row(row)
+    visible_rows.clear()
+
+
+def scroll_to_row(index):
+    """Scroll just enough for row `index` to be fully visible."""
+    update_scrollregion()
+    top = canvas.canvasy(0)
+    height = canvas.winfo_height()
+    y = row_y(index)
+    if top <= y - 40 and y + LINE_HEIGHT <= top + height:
+        return
+    total = max(height, row_y(len(page.tasks)) + 2 * LINE_HEIGHT)
+    target = y - 40 if y - 40 < top else y + LINE_HEIGHT - height
+    canvas.yview_moveto(max(0, target) / total)
+    on_viewport_change()
+
+
+def on_viewport_change():
+    render_rows()
+    redraw_lines()
+
+
+def on_scroll(*args):
+    canvas.yview(*args)
+    on_viewport_change()
+
+
+def on_mouse_wheel(event):
+    if event.num == 4 or event.delta > 0:
+        canvas.yview_scroll(-3, "units")
+    else:
+        canvas.yview_scroll(3, "units")
+    on_viewport_change()
+
+
+def on_row_press(event):
+    """One binding for every row slot: clicks resolve the task the slot
+    currently shows through row_items."""
+    item = canvas.find_withtag("current")
+    row, part = row_items.get(item[0], (None, None)) if item else (None, None)
+    if row is None or row["task"] is None or page.loading:
+        return
+    if part == "star":
+        toggle_priority(row["task"])
+    else:
+        toggle_task(row["task"])
+
+
+# ------------------- ERASER CRUMBS ----------------------
+# Crumbs are a small particle system: at most PARTICLE_BUDGET ovals are ever
+# created, dead crumbs are hidden and reused, and one shared animation
+# moves every live crumb per frame.
+def crumb_steps():
+    """Small crumbs that fall and fade."""
+    while live_crumbs:
+        for crumb in list(live_crumbs):
+            item, age = crumb
+            dx = random.randint(-1, 1)
+            dy = random.randint(1, 3)
+            canvas.move(item, dx, dy)
+            alpha = max(0, 255 - age * 12)
+            canvas.itemconfig(item, fill=f"#{alpha:02x}{alpha:02x}{alpha:02x}")
+            crumb[1] += 1
+            if crumb[1] >= CRUMB_LIFETIME:
+                canvas.itemconfig(item, state="hidden")
+                live_crumbs.remove(crumb)
+                free_crumbs.append(item)
+        yield
+
+
+def end_crumbs():
+    global crumb_animation
+    crumb_animation = None
+
+
+def spawn_crumb(x, y):
+    global crumb_animation
+    if free_crumbs:
+        item = free_crumbs.pop()
+    elif len(crumb_items) < PARTICLE_BUDGET:
+        item = canvas.create_oval(0, 0, 0, 0, outline="")
+        crumb_items.append(item)
+    else:
+        return  # over budget: this crumb is simply not drawn
+
+    canvas.coords(item, x, y, x + 3, y + 3)
+    canvas.itemconfig(item, fill="#C8B8A8", state="normal")
+    canvas.tag_raise(item)
+    live_crumbs.append([item, 0])
+
+    # crumbs are decoration: they never push real animations over the cap
+    if crumb_animation is None:
+        crumb_animation = animate(crumb_steps(), end_crumbs, capped=False)
+
+
+def erase_steps(task):
+    """Erase the line letter by letter, dropping crumbs as it goes.
+
+    The text is a single canvas item, so a letter is erased by blanking it
+    out of the string; the monospace font keeps the rest of the line in place.
+    Frames are skipped while the task is scrolled out of view.
+    """
+    text = task.text
+
+    for i in range(len(text)):
+        if not task.done:
+            return  # unchecked mid-erase; toggle_task restored the text
+        row = task.row
+        if row is None:
+            continue
+        canvas.itemconfig(row["item"], text=" " * (i + 1) + text[i + 1:])
+        if not text[i].isspace():
+            mid_x = TEXT_START_X + i * CHAR_WIDTH + CHAR_WIDTH // 2
+            mid_y = row_y(row["index"]) - 2
+            for _ in range(3):
+                spawn_crumb(mid_x, mid_y)
+        yield
+        yield
+
+    if task.done and task.row is not None:
+        canvas.itemconfig(task.row["item"], text="")
+
+
+# ---------------- COMPLETED TASKS COLUMN ----------------
+# The column lists every completed task, oldest first: the archived ones
+# (see Page.archive_completed) above the in-memory window. Archived
+# entries are read and drawn ARCHIVE_PAGE_SIZE at a time, only once they
+# are scrolled into view.
+def completed_y(position):
+    return 60 + position * COMPLETED_ROW_HEIGHT
+
+
+def draw_completed(entry, position):
+    y = completed_y(position)
+
+    text_id = completed_canvas.create_text(
+        10,
+        y,
+        anchor="w",
+        font=("Courier New", 12),
+        text=entry["text"],
+        fill=COLORS["FG_TEXT"],
+        tags=("completed_text", page_tag)
+    )
+
+    # strikethrough
+    bbox = completed_canvas.bbox(text_id)
+    if bbox:
+        x1, y1, x2, y2 = bbox
+        completed_canvas.create_line(
+            x1, (y1 + y2) // 2, x2, (y1 + y2) // 2,
+            fill=COLORS["FG_TEXT"],
+            width=2,
+            tags=("strike", page_tag)
+        )
+
+    completed_canvas.create_text(
+        completed_canvas.winfo_width() - 10,
+        y,
+        anchor="e",
+        font=("Courier New", 10),
+        text=stars_text(entry["priority"]),
+        fill="#e6b800",
+        tags=("completed_star", page_tag)
+    )
+
+
+def update_completed_scrollregion():
+    total = page.archived + len(page.completed)
+    height = max(completed_canvas.winfo_height(), completed_y(total) + COMPLETED_ROW_HEIGHT)
+    completed_canvas.configure(scrollregion=(0, 0, completed_canvas.winfo_width(), height))
+
+
+def fill_completed_view():
+    """Draw the archived pages that are scrolled into view."""
+    view = archive_views[page]
+    top = completed_canvas.canvasy(0)
+    bottom = top + completed_canvas.winfo_height()
+    first = max(0, int((top - 60) // COMPLETED_ROW_HEIGHT))
+    last = min(view["drawn_from"], int((bottom - 60) // COMPLETED_ROW_HEIGHT) + 1)
+    if first >= last:
+        return
+
+    for number in range(first // ARCHIVE_PAGE_SIZE, (last - 1) // ARCHIVE_PAGE_SIZE + 1):
+        if number in view["pages"]:
+            continue
+        view["pages"].add(number)
+        start = number * ARCHIVE_PAGE_SIZE
+        count = min(ARCHIVE_PAGE_SIZE, view["drawn_from"] - start)
+        for offset, entry in enumerate(page.read_archive(start, count)):
+            draw_completed(entry, start + offset)
+
+
+def show_newest_completed():
+    update_completed_scrollregion()
+    completed_canvas.yview_moveto(1.0)
+    fill_completed_view()
+
+
+def on_completed_wheel(event):
+    if event.num == 4 or event.delta > 0:
+        completed_canvas.yview_scroll(-3, "units")
+    else:
+        completed_canvas.yview_scroll(3, "units")
+    fill_completed_view()
+
+
+# ------------------ PRIORITY STARS ----------------------
+def toggle_priority(task):
+    page.cycle_priority(task)
+
+
+# ---------------- CHECK / UNCHECK TASK ------------------
+def toggle_task(task):
+    if not task.done:
+        page.set_done(task, True)
+
+        def after():
+            if not task.done or page.tasks_by_id.get(task.id) is not task:
+                return  # unchecked again, or the page was replaced meanwhile
+            page.complete_task(task)
+
+        animate(erase_steps(task), after)
+    else:
+        page.set_done(task, False)
+
+
+# =========================
+# PAGE EVENTS
+# =========================
+# The model (todomodel.Page) owns the data and its saving; these handlers
+# only bring the canvas in line with what changed.
+def on_page_event(event, *args):
+    """Mirror a change of the current page on the canvas."""
+    if event == "add":
+        task = args[0]
+        if search_query and matches_query(task.text):
+            search_matches.add(task.id)
+        render_rows()
+    elif event == "extend":
+        # a pasted batch: only the rows that reach the viewport get items
+        if search_query:
+            search_matches.update(
+                task.id for task in args[0] if matches_query(task.text)
+            )
+        render_rows()
+    elif event == "change":
+        row = args[0].row
+        if row is not None:
+            bind_row(row, row["index"])
+    elif event == "remove":
+        remove_task_row(*args)
+    elif event == "completed":
+        draw_completed(args[0], page.archived + len(page.completed) - 1)
+        show_newest_completed()
+    elif event == "reset":
+        render_page()
+    elif event == "loading":
+        # another chunk arrived: the page got longer
+        render_rows()
+    elif event == "loaded":
+        refresh_loaded_page()
+
+
+def remove_task_row(task, index, unpinned):
+    """Close the gap a deleted task leaves behind."""
+    global current_y
+    search_matches.discard(task.id)
+    for p in unpinned:
+        unpin_postit_items(p)
+
+    row = visible_rows.pop(index, None)
+    if row is not None:
+        release_row(row)
+
+    # Everything below the deleted row moves up one line in a single tagged
+    # move: row items (and the typing line) overlapping the band under it,
+    # and pinned post-its lying entirely below their old anchor.
+    bottom = row_y(len(page.tasks) + 2) + canvas.winfo_height()
+    canvas.addtag_overlapping("shift_rows", 0, row_y(index) + LINE_HEIGHT // 2, 10000, bottom)
+    canvas.addtag_enclosed("shift_pins", -10000, row_y(index) - 25, 10000, bottom + 200)
+    canvas.move(
+        f"(shift_rows&&(row||typing))||(shift_pins&&pinned&&{page_tag})",
+        0, -LINE_HEIGHT
+    )
+    canvas.dtag("shift_rows")
+    canvas.dtag("shift_pins")
+    if current_y is not None and current_y > row_y(index):
+        current_y -= LINE_HEIGHT
+
+    # the slots below now show the same tasks one index up
+    shifted = {}
+    for i, r in visible_rows.items():
+        if i > index:
+            i -= 1
+            r["index"] = i
+        shifted[i] = r
+    visible_rows.clear()
+    visible_rows.update(shifted)
+
+    # a row may have scrolled up into view at the bottom
+    render_rows()
+
+
+def refresh_loaded_page():
+    """The journal replayed after a progressive load may have moved rows,
+    and pinned notes are only known once all tasks are read."""
+    global search_matches
+    search_matches = find_matches(search_query) if search_query else set()
+    release_all_rows()
+    render_rows()
+    refresh_pins()
+
+
+def refresh_pins():
+    """Show the pins of notes drawn before their pinned task was known."""
+    for p in page.postits:
+        if p["pinned_task"] is not None and "pin" in p:
+            canvas.addtag_withtag("pinned", note_tag(p))
+            canvas.itemconfig(p["pin"], fill="red")
+
+
+def render_page():
+    """Draw the whole current page (after a switch, a load or a replace)."""
+    global search_matches
+    clear_current_page_ui()
+    search_matches = find_matches(search_query) if search_query else set()
+    render_rows()
+
+    # archived entries are drawn on demand by fill_completed_view
+    archive_views[page] = {"drawn_from": page.archived, "pages": set()}
+    for position, entry in enumerate(page.completed, page.archived):
+        draw_completed(entry, position)
+    show_newest_completed()
+
+    for p in page.postits:
+        draw_postit(p)
+        bind_postit(p)
+
+
+def show_page(new_page):
+    """Put `new_page` on screen and follow its changes from now on.
+
+    The post-its and completed column of the last RENDER_CACHE_PAGES pages
+    stay on the canvases, hidden under their page tag, so switching back
+    only unhides them; older pages fall back to their plain model and are
+    drawn again when next shown.
+    """
+    global page, page_tag, search_matches
+    if page is not None:
+        page.unsubscribe(on_page_event)
+        rendered_pages[page] = canvas.yview()[0]
+        canvas.itemconfig(page_tag, state="hidden")
+        completed_canvas.itemconfig(page_tag, state="hidden")
+
+    page = new_page
+    page_tag = f"page{id(page)}"
+    page.subscribe(on_page_event)
+
+    if page not in rendered_pages:
+        render_page()
+    else:
+        # most recently shown goes last
+        scroll = rendered_pages.pop(page)
+        release_all_rows()
+        clear_current_input()
+        canvas.itemconfig(page_tag, state="normal")
+        completed_canvas.itemconfig(page_tag, state="normal")
+        search_matches = find_matches(search_query) if search_query else set()
+        update_scrollregion()
+        canvas.yview_moveto(scroll)
+        render_rows()
+        redraw_lines()
+        show_newest_completed()
+        if not page.loading:
+            # it may have finished loading while another page was shown
+            refresh_pins()
+    rendered_pages[page] = 0.0
+
+    while len(rendered_pages) > RENDER_CACHE_PAGES:
+        oldest = next(iter(rendered_pages))
+        del rendered_pages[oldest]
+        archive_views.pop(oldest, None)
+        clear_page_items(f"page{id(oldest)}")
+
+
+# =========================
+# NOTEBOOK LINES + MARGIN
+# =========================
+def redraw_lines(event=None):
+    """Rule the part of the (scrollable) page that is currently in view.
+
+    Line items stay alive and are kept per line index, like task rows:
+    scrolling only rebinds lines entering or leaving the viewport, and
+    only a change of width touches the lines already shown.
+    """
+    global margin_line, lines_width
+    width = canvas.winfo_width()
+    top = int(canvas.canvasy(0))
+    bottom = top + canvas.winfo_height()
+    created = False
+
+    # red margin on the left
+    if margin_line is None:
+        margin_line = canvas.create_line(
+            60, 0, 60, 0,
+            fill=COLORS["LINE_MARGIN"],
+            width=2,
+            tags=("notepad_line", "margin")
+        )
+        created = True
+    canvas.coords(margin_line, 60, max(LINE_START_Y - 40, top), 60, bottom - 10)
+
+    # horizontal blue lines
+    first = max(0, -(-(top - LINE_START_Y) // LINE_HEIGHT))
+    last = max(first, -(-(bottom - LINE_START_Y) // LINE_HEIGHT))
+
+    for i in list(ruled_lines):
+        if not first <= i < last:
+            item = ruled_lines.pop(i)
+            canvas.itemconfig(item, state="hidden")
+            free_lines.append(item)
+
+    resized = width != lines_width
+    lines_width = width
+    for i in range(first, last):
+        item = ruled_lines.get(i)
+        if item is None:
+            if free_lines:
+                item = free_lines.pop()
+                canvas.itemconfig(item, state="normal")
+            else:
+                item = canvas.create_line(
+                    0, 0, 0, 0,
+                    fill=COLORS["LINE_BLUE"],
+                    tags=("notepad_line", "ruled")
+                )
+                created = True
+            ruled_lines[i] = item
+        elif not resized:
+            continue
+        canvas.coords(item, 20, row_y(i), width - 20, row_y(i))
+
+    if created:
+        canvas.tag_lower("notepad_line")
+
+
+# =========================
+# TYPING DIRECTLY ON PAPER
+# =========================
+def clear_current_input():
+    global current_text, current_text_item, caret, caret_active, current_y
+    if current_text_item:
+        canvas.delete(current_text_item)
+
+    current_text_item = None
+
+    if caret:
+        canvas.delete(caret)
+
+    caret = None
+    current_text = ""
+    current_y = None
+    caret_active = False
+
+
+def blink_caret():
+    if not caret_active or caret is None:
+        return
+    state = canvas.itemcget(caret, "state")
+    canvas.itemconfig(caret, state="hidden" if state == "normal" else "normal")
+    window.after(500, blink_caret)
+
+
+def start_typing():
+    global current_text, current_text_item, caret_active, current_y, caret
+    if page.loading:
+        return  # new tasks go at the bottom, which is not known yet
+    clear_current_input()
+    scroll_to_row(len(page.tasks))
+
+    current_y = row_y(len(page.tasks))
+    caret_active = True
+
+    current_text_item = canvas.create_text(
+        TEXT_START_X, current_y - 2,
+        text="",
+        anchor="w",
+        font=TASK_FONT,
+        fill=COLORS["FG_TEXT"],
+        tags="typing"
+    )
+
+    caret = canvas.create_line(
+        TEXT_START_X, current_y - 10,
+        TEXT_START_X, current_y + 5,
+        width=2,
+        fill=COLORS["FG_TEXT"],
+        tags="typing"
+    )
+    blink_caret()
+
+
+def on_key_press(event):
+    global current_text, current_text_item, caret, current_y, caret_active
+
+    if not caret_active or current_y is None:
+        return
+
+    if event.keysym == "Return":
+        txt = current_text.strip()
+        if txt:
+            page.add_task(txt)
+        clear_current_input()
+        on_search_change()
+        return
+
+    if event.keysym == "BackSpace":
+        if current_text:
+            current_text = current_text[:-1]
+            canvas.itemconfig(current_text_item, text=current_text)
+            new_x = TEXT_START_X + len(current_text) * CHAR_WIDTH
+            canvas.coords(caret, new_x, current_y - 10, new_x, current_y + 5)
+        return
+
+    if not event.char or not event.char.isprintable():
+        return
+
+    current_text += event.char
+    canvas.itemconfig(current_text_item, text=current_text)
+
+    new_x = TEXT_START_X + len(current_text) * CHAR_WIDTH
+    canvas.coords(caret, new_x, current_y - 10, new_x, current_y + 5)
+
+
+def on_paste(event):
+    """Ctrl+V while typing a task: every pasted line becomes a task.
+
+    The whole clipboard goes in as one batch (Page.add_tasks), so a long
+    list costs one journal record and one render pass, not one per line.
+    """
+    global current_text
+    if event.widget is search_entry or not caret_active or current_y is None:
+        return
+    try:
+        pasted = window.clipboard_get()
+    except tk.TclError:
+        return  # empty clipboard or not text
+
+    lines = pasted.splitlines()
+    if len(lines) <= 1:
+        # a single line just continues what is being typed
+        current_text += "".join(ch for ch in pasted if ch.isprintable())
+        canvas.itemconfig(current_text_item, text=current_text)
+        new_x = TEXT_START_X + len(current_text) * CHAR_WIDTH
+        canvas.coords(caret, new_x, current_y - 10, new_x, current_y + 5)
+        return "break"
+
+    texts = [line.strip() for line in lines]
+    texts[0] = (current_text + texts[0]).strip()
+    page.add_tasks([text for text in texts if text])
+    clear_current_input()
+    return "break"
+
+
+# =========================
+# POST-ITS: DELETE / PIN / DRAG
+# =========================
+def postit_parts(p):
+    return (p["shadow"], p["rect"], p["text"], p["delete"], p["pin"])
+
+
+def note_tag(p):
+    """Tag shared by all parts of one post-it, so it moves in one call."""
+    return f"note{p['id']}"
+
+
+def delete_postit(p):
+    if page.loading:
+        return  # its pin is restored once the load ends
+    for part in postit_parts(p):
+        postit_items.pop(part, None)
+    canvas.delete(note_tag(p))
+    page.remove_postit(p)
+
+
+def unpin_postit_items(p):
+    canvas.dtag(note_tag(p), "pinned")
+    canvas.itemconfig(p["pin"], fill="grey")
+
+
+def toggle_pin(p):
+    """Pin to nearest task, or unpin."""
+    if p["pinned_task"] is None:
+        nearest = page.nearest_row(p["y"] + 60)
+        if nearest is None or page.loading:
+            return
+
+        old_y = p["y"]
+        page.pin_postit(p, nearest)
+        canvas.move(note_tag(p), 0, p["y"] - old_y)
+        canvas.addtag_withtag("pinned", note_tag(p))
+
+        canvas.itemconfig(p["pin"], fill="red")
+    else:
+        page.unpin_postit(p)
+        unpin_postit_items(p)
+
+
+def start_postit_drag(p, event):
+    """Begin dragging a post-it if it is not pinned."""
+    global dragging_postit, last_drag_pos
+    if p["pinned_task"] is not None or page.loading:
+        return  # while loading, pins are not known yet
+    dragging_postit = p
+    last_drag_pos = (event.x, event.y)
+
+
+def drag_postit_motion(event):
+    """Collect mouse motion; it reaches the canvas at most once per frame."""
+    global last_drag_pos, drag_job
+    if dragging_postit is None:
+        return
+    x, y = event.x, event.y
+    drag_pending[0] += x - last_drag_pos[0]
+    drag_pending[1] += y - last_drag_pos[1]
+    last_drag_pos = (x, y)
+
+    if drag_job is None:
+        drag_job = window.after(FRAME_MS, apply_drag)
+
+
+def apply_drag():
+    """Move the dragged post-it by the motion collected since last frame."""
+    global drag_job
+    if drag_job is not None:
+        window.after_cancel(drag_job)
+        drag_job = None
+    dx, dy = drag_pending
+    drag_pending[:] = [0, 0]
+    if dragging_postit is not None and (dx or dy):
+        canvas.move(note_tag(dragging_postit), dx, dy)
+
+
+def end_postit_drag(event):
+    global dragging_postit
+    if dragging_postit is not None:
+        apply_drag()
+        x1, y1, x2, y2 = canvas.coords(dragging_postit["rect"])
+        page.move_postit(dragging_postit, x1, y1)
+        dragging_postit = None
+
+
+# =========================
+# POST-ITS: CREATE / PLACE
+# =========================
+def draw_postit(p, lift=0):
+    """Create the canvas items of a post-it model, `lift` pixels above it."""
+    x, y = p["x"], p["y"] - lift
+    tags = ("postit", page_tag, note_tag(p))
+
+    # shadow (behind)
+    p["shadow"] = canvas.create_rectangle(
+        x + 4, y + 6, x + 144, y + 126,
+        fill="#c4c4c4", outline="", width=0, tags=tags
+    )
+
+    p["rect"] = canvas.create_rectangle(
+        x, y, x + 140, y + 120,
+        fill=p["color"], outline="#E0C96F", width=3, tags=tags
+    )
+    p["text"] = canvas.create_text(
+        x + 10, y + 10,
+        anchor="nw",
+        text=p["body"],
+        width=120,
+        font=("Segoe UI", 11),
+        fill="#111111",
+        tags=tags
+    )
+
+    p["delete"] = canvas.create_text(
+        x + 130, y + 10,
+        text="✖",
+        font=("Segoe UI", 11),
+        fill="grey",
+        tags=tags
+    )
+
+    p["pin"] = canvas.create_text(
+        x + 120, y + 30,
+        text="📌",
+        font=("Segoe UI", 11),
+        fill="red" if p["pinned_task"] is not None else "grey",
+        tags=tags
+    )
+
+    if p["pinned_task"] is not None:
+        canvas.addtag_withtag("pinned", note_tag(p))
+    return postit_parts(p)
+
+
+def bind_postit(p):
+    """Make a drawn post-it respond to clicks (see on_postit_press)."""
+    for part in postit_parts(p):
+        postit_items[part] = p
+
+
+def on_postit_press(event):
+    """One binding for every post-it: find the note from the clicked item."""
+    item = canvas.find_withtag("current")
+    p = postit_items.get(item[0]) if item else None
+    if p is None:
+        return
+    if item[0] == p["delete"]:
+        delete_postit(p)
+    elif item[0] == p["pin"]:
+        toggle_pin(p)
+    elif item[0] in (p["rect"], p["text"]):
+        start_postit_drag(p, event)
+
+
+def place_postit_at(x, y, text, color):
+    p = page.add_postit(text, color, x, y)
+    draw_postit(p, lift=30)
+    animate(drop_steps(note_tag(p), 30), lambda: bind_postit(p))
+
+
+def drop_steps(tag, distance):
+    """Drop a post-it (all items under `tag`) into place with a small bounce."""
+    # drop animation
+    for _ in range(10):
+        canvas.move(tag, 0, distance / 10)
+        yield
+
+    # small bounce
+    for _ in range(3):
+        canvas.move(tag, 0, -2)
+        yield
+
+    for _ in range(3):
+        canvas.move(tag, 0, 2)
+        yield
+
+
+# =========================
+# POST-IT PREVIEW (GHOST)
+# =========================
+def create_postit_preview(text):
+    global placing_postit, postit_text_to_place, preview_postit
+
+    if preview_postit:
+        canvas.delete(preview_postit["rect"])
+        canvas.delete(preview_postit["text"])
+        preview_postit = None
+
+    placing_postit = True
+    postit_text_to_place = text
+
+    x, y = 150, canvas.canvasy(0) + 150
+
+    rect = canvas.create_rectangle(
+        x, y, x + 140, y + 120,
+        fill="#FFFDE1",
+        outline="#E0C96F",
+        width=2
+    )
+    text_id = canvas.create_text(
+        x + 10,
+        y + 10,
+        anchor="nw",
+        text=text,
+        width=120,
+        font=("Segoe UI", 11),
+        fill="#555555"
+    )
+
+    preview_postit = {"rect": rect, "text": text_id}
+
+
+def open_postit_input():
+    """Popup to type a post-it and choose color."""
+    popup = tk.Toplevel(window)
+    popup.title("New Post-it")
+    popup.geometry("300x200")
+    popup.configure(bg=COLORS["BG_WINDOW"])
+
+    tk.Label(popup, text="Write your Post-it:", fg=COLORS["FG_TEXT"], bg=COLORS["BG_WINDOW"]).pack(pady=5)
+    entry = tk.Entry(popup, width=30)
+    entry.pack(pady=5)
+
+    tk.Label(popup, text="Color:", fg=COLORS["FG_TEXT"], bg=COLORS["BG_WINDOW"]).pack(pady=5)
+
+    color_var = tk.StringVar(popup)
+    color_var.set("Yellow")
+    tk.OptionMenu(popup, color_var, *POSTIT_COLORS.keys()).pack(pady=5)
+
+    def confirm():
+        global postit_color_to_place
+        txt = entry.get().strip()
+        if txt:
+            postit_color_to_place = POSTIT_COLORS[color_var.get()]
+            create_postit_preview(txt)
+        popup.destroy()
+
+    tk.Button(popup, text="Add", command=confirm).pack(pady=10)
+
+
+def on_mouse_move(event):
+    """Move ghost preview while placing."""
+    if not placing_postit or preview_postit is None:
+        return
+
+    top = canvas.canvasy(0)
+    x, y = canvas.canvasx(event.x), canvas.canvasy(event.y)
+    max_w = canvas.winfo_width() - 140
+    max_h = top + canvas.winfo_height() - 120
+
+    x = max(0, min(x, max_w))
+    y = max(top, min(y, max_h))
+
+    canvas.coords(preview_postit["rect"], x, y, x + 140, y + 120)
+    canvas.coords(preview_postit["text"], x + 10, y + 10)
+
+
+def on_right_click(event):
+    """Right-click to stick the post-it."""
+    global placing_postit, postit_text_to_place, preview_postit
+
+    if not placing_postit or preview_postit is None:
+        return
+    if page.loading:
+        return  # the ghost stays until the page is fully loaded
+
+    x1, y1, x2, y2 = canvas.coords(preview_postit["rect"])
+    text = postit_text_to_place
+    color = postit_color_to_place
+
+    canvas.delete(preview_postit["rect"])
+    canvas.delete(preview_postit["text"])
+    preview_postit = None
+
+    placing_postit = False
+    postit_text_to_place = ""
+
+    place_postit_at(x1, y1, text, color)
+
+
+# =========================
+# SEARCH BAR + HIGHLIGHT
+# =========================
+# Matching itself is done by the page (todomodel.Page.find); search_matches
+# holds the ids matching search_query and is kept current as tasks come and
+# go, so each keystroke only restyles rows whose highlight state changed.
+def task_text_style(task):
+    """(style tag, fill, font) for a task's text under the current search query.
+
+    The style tag files the text under its theme class (see apply_theme).
+    """
+    if task.id in search_matches:
+        # highlight match
+        return "text_match", "#ffd300", TASK_FONT_BOLD
+    # dim or reset
+    if search_query:
+        return "text_dim", COLORS["DIM_TEXT"], TASK_FONT
+    return "text_normal", COLORS["FG_TEXT"], TASK_FONT
+
+
+def restyle_row(row):
+    style, fill, font = task_text_style(row["task"])
+    canvas.itemconfig(row["item"], fill=fill, font=font, tags=("row", "task_text", style))
+
+
+def restyle_visible_rows():
+    for row in visible_rows.values():
+        restyle_row(row)
+
+
+def find_matches(query, within=None):
+    """Ids of the current page's tasks to highlight for `query`."""
+    if fuzzy_search:
+        return {task.id for _, task in page.fuzzy_find(query, FUZZY_MATCHES)}
+    return page.find(query, within)
+
+
+def matches_query(text):
+    """Whether a task added while searching should be highlighted."""
+    if fuzzy_search:
+        return fuzzy_match_score(text, words(search_query)) > 0
+    return search_query in text.lower()
+
+
+def set_search_query(query):
+    global search_query, search_matches
+    if query == search_query:
+        return
+
+    # if the query only grew, the answer is a subset of the last one
+    # (not so for fuzzy top-k results)
+    grew = search_query and search_query in query and not fuzzy_search
+    within = search_matches if grew else None
+    matches = find_matches(query, within) if query else set()
+    changed = matches ^ search_matches
+    dim_changed = bool(query) != bool(search_query)
+    search_query = query
+    search_matches = matches
+
+    if dim_changed:
+        # every non-matching row switches between dimmed and normal
+        restyle_visible_rows()
+    elif len(changed) < len(visible_rows):
+        for task_id in changed:
+            row = page.tasks_by_id[task_id].row
+            if row is not None:
+                restyle_row(row)
+    else:
+        for row in visible_rows.values():
+            if row["task"].id in changed:
+                restyle_row(row)
+
+
+def toggle_fuzzy_search(event=None):
+    """Click on the search label: switch between exact and fuzzy search."""
+    global fuzzy_search, search_query
+    fuzzy_search = not fuzzy_search
+    search_label.configure(text="Fuzzy:" if fuzzy_search else "Search:")
+    if fuzzy_search and page.word_index is None and not page.loading:
+        page.build_word_index()  # now, rather than on the first keystroke
+    query = search_query
+    search_query = ""  # search again in the new mode
+    set_search_query(query)
+    if search_results.winfo_ismapped():
+        show_search_results()
+
+
+def clear_search(event=None):
+    """Clear search and reset text colors."""
+    if search_entry.get():
+        search_entry.delete(0, tk.END)
+    set_search_query("")
+    hide_search_results()
+
+
+def on_search_change(event=None):
+    """Highlight matching tasks by bright text, dim others.
+
+    Only rows in the viewport have canvas items; rows scrolled in later get
+    their style from task_text_style when bound.
+    """
+    query = search_entry.get().strip().lower()
+    changed = query != search_query
+    set_search_query(query)
+    if changed and search_results is not None and search_results.winfo_ismapped():
+        schedule_search_results()
+
+
+def schedule_search_results():
+    """Refresh the all-pages list once typing pauses, not on every key."""
+    global search_results_job
+    if search_results_job is not None:
+        window.after_cancel(search_results_job)
+    search_results_job = window.after(SEARCH_REFRESH_MS, show_search_results)
+
+
+# ------------------ SEARCH ALL PAGES ----------------------
+def show_search_results(event=None):
+    """List the best matches on every page under the search box (Return).
+
+    The hits come from the page models (Notebook.search); no other page is
+    drawn until a hit is picked. Pages not read yet are listed as pending
+    while read_pages_for_search reads them.
+    """
+    global search_hits, search_results_job
+    if search_results_job is not None:
+        window.after_cancel(search_results_job)
+        search_results_job = None
+    query = search_entry.get().strip().lower()
+    if not query:
+        hide_search_results()
+        return
+    search_hits = notebook.search(query, SEARCH_RESULTS, fuzzy_search)
+    pending = notebook.unread_pages()
+
+    search_results.delete(0, tk.END)
+    marks = {"task": "", "completed": "✓ ", "postit": "📝 "}
+    for hit in search_hits:
+        search_results.insert(tk.END, f"{hit['page']}:  {marks[hit['kind']]}{hit['text']}")
+    if pending:
+        search_results.insert(tk.END, f"… searching {len(pending)} more page(s)")
+    elif not search_hits:
+        search_results.insert(tk.END, "No matches")
+    search_results.configure(height=min(max(search_results.size(), 1), 10))
+    search_results.place(x=420, y=36, width=360)
+    search_results.lift()
+    read_pages_for_search()
+
+
+def read_pages_for_search():
+    """Read the pages not opened yet in window.after slices, one at a time,
+    like the startup load; the list is refreshed as each one is done."""
+    global search_read_job
+    if search_read_job is not None:
+        return
+    unopened = [name for name, p in notebook.pages.items() if p is None]
+    if unopened:
+        steps = notebook.page(unopened[0], progressive=True).load_steps()
+        search_read_job = window.after(1, search_read_step, steps)
+
+
+def search_read_step(steps):
+    global search_read_job
+    try:
+        next(steps)
+    except StopIteration:
+        search_read_job = None
+        # the next page is read only while the list is still shown
+        if search_results.winfo_ismapped():
+            show_search_results()
+        return
+    search_read_job = window.after(1, search_read_step, steps)
+
+
+def hide_search_results():
+    global search_results_job
+    if search_results_job is not None:
+        window.after_cancel(search_results_job)
+        search_results_job = None
+    if search_results is not None:
+        search_results.place_forget()
+
+
+def on_search_result(event=None):
+    selection = search_results.curselection()
+    if not selection or selection[0] >= len(search_hits):
+        return
+    hit = search_hits[selection[0]]
+    hide_search_results()
+    jump_to_hit(hit)
+
+
+def jump_to_hit(hit):
+    """Open the hit's page and scroll the hit into view."""
+    switch_tab(hit["page"])
+    target = hit["target"]
+    if hit["kind"] == "task":
+        if page.tasks_by_id.get(target.id) is target:
+            scroll_to_row(page.tasks.index(target))
+    elif hit["kind"] == "completed":
+        update_completed_scrollregion()
+        total = page.archived + len(page.completed)
+        height = max(completed_canvas.winfo_height(), completed_y(total) + COMPLETED_ROW_HEIGHT)
+        top = completed_y(target) - completed_canvas.winfo_height() // 2
+        completed_canvas.yview_moveto(max(0, top) / height)
+        fill_completed_view()
+    elif target in page.postits:
+        canvas.tag_raise(note_tag(target))
+        row = page.nearest_row(target["y"] + 60)
+        if row is not None:
+            scroll_to_row(row)
+
+
+# =========================
+# CLICK HANDLING / LOAD / LAYOUT
+# =========================
+def on_canvas_click(event):
+    if placing_postit:
+        return
+
+    # click off search
+    clear_search()
+
+    # if clicking on a post-it, don't start typing
+    if page.postit_at(canvas.canvasx(event.x), canvas.canvasy(event.y)) is not None:
+        return
+
+    next_y = row_y(len(page.tasks))
+    if canvas.canvasy(event.y) >= next_y - 15:
+        start_typing()
+
+
+def load_tasks():
+    """Show the current page as soon as its first chunk of tasks is read.
+
+    The rest is read in window.after slices, so the window paints and
+    stays responsive while a big page loads; time to first paint and to
+    fully loaded are printed once it is done.
+    """
+    global first_paint_ms
+    new_page = notebook.page(progressive=True)
+    steps = new_page.load_steps()
+    next(steps, None)
+    show_page(new_page)
+    window.update_idletasks()
+    first_paint_ms = (time.perf_counter() - startup_started) * 1000
+    window.after(1, load_step, new_page, steps)
+
+
+def load_step(loading_page, steps):
+    try:
+        next(steps)
+    except StopIteration:
+        window.update_idletasks()
+        loaded_ms = (time.perf_counter() - startup_started) * 1000
+        print(f"Startup: first paint {first_paint_ms:.0f} ms, "
+              f"fully loaded {loaded_ms:.0f} ms ({len(loading_page.tasks)} tasks)")
+        if search_results is not None and search_results.winfo_ismapped():
+            schedule_search_results()  # it was listed as pending
+        return
+    window.after(1, load_step, loading_page, steps)
+
+
+def clear_page_items(tag):
+    """Delete the post-its and completed entries drawn for one page."""
+    for item in canvas.find_withtag(tag):
+        postit_items.pop(item, None)
+    canvas.delete(tag)
+    completed_canvas.delete(tag)
+
+
+def clear_current_page_ui():
+    # clear tasks (row slots go back to the pool)
+    release_all_rows()
+
+    # clear completed + post-its
+    clear_page_items(page_tag)
+
+    clear_current_input()
+    canvas.yview_moveto(0)
+    update_scrollregion()
+    redraw_lines()
+
+
+# =========================
+# TABS: SWITCH / ADD
+# =========================
+def switch_tab(name):
+    if notebook.current == name:
+        return
+
+    # land running animations (erasing tasks, dropping notes) on this page
+    fast_forward_animations()
+    show_page(notebook.switch(name))
+    refresh_tab_bar()
+
+
+def add_new_tab():
+    switch_tab(notebook.add_page())
+
+
+def refresh_tab_bar():
+    if tab_frame is None:
+        return
+
+    for w in tab_frame.winfo_children():
+        w.destroy()
+
+    for name in notebook.pages.keys():
+        is_active = (name == notebook.current)
+        btn = tk.Button(
+            tab_frame,
+            text=name,
+            relief="sunken" if is_active else "flat",
+            bg="#dddddd" if is_active else "#cccccc",
+            padx=8,
+            pady=1,
+            command=lambda n=name: switch_tab(n)
+        )
+        btn.pack(side="left", padx=(0, 2))
+
+    plus_btn = tk.Button(
+        tab_frame,
+        text="+",
+        relief="flat",
+        bg="#cccccc",
+        padx=6,
+        pady=1,
+        command=add_new_tab
+    )
+    plus_btn.pack(side="left")
+
+
+def init_tabs():
+    """Read the page list; pages stay on disk until they are opened."""
+    notebook.load_index()
+    refresh_tab_bar()
+
+
+def on_configure(event=None):
+    """<Configure> fires many times per second during a window drag (and
+    for every child widget); run at most one layout pass per frame."""
+    global layout_job
+    if layout_job is None:
+        layout_job = window.after(FRAME_MS, run_layout)
+
+
+def run_layout():
+    global layout_job
+    layout_job = None
+    update_layout()
+
+
+def update_layout(event=None):
+    """Resize left (notepad) and right (completed) areas."""
+    W = window.winfo_width()
+    H = window.winfo_height()
+
+    note_w = int(W * NOTE_WIDTH_RATIO)
+    comp_w = W - note_w
+
+    canvas.place(x=0, y=45, width=note_w - SCROLLBAR_WIDTH, height=H - 55)
+    scrollbar.place(x=note_w - SCROLLBAR_WIDTH, y=45, width=SCROLLBAR_WIDTH, height=H - 55)
+    completed_canvas.place(x=note_w, y=45, width=comp_w, height=H - 55)
+
+    if cleanup_button:
+        cleanup_button.place(x=note_w - 140, y=10)
+
+    # the window may have grown: fill the new space with rows
+    if page is not None:
+        render_rows()
+    redraw_lines()
+
+    x = star_x()
+    for row in visible_rows.values():
+        canvas.coords(row["star"], x, row_y(row["index"]) - 2)
+
+
+# =========================
+# DARK / LIGHT SLIDER TOGGLE
+# =========================
+def slide_steps(dx):
+    for _ in range(10):
+        toggle_canvas.move(toggle_knob, dx, 0)
+        yield
+
+
+def slide_toggle(event=None):
+    global current_theme, toggle_animation
+    if toggle_canvas is None:
+        return
+
+    # a second click lands the previous slide first
+    if toggle_animation is not None:
+        finish_animation(toggle_animation)
+
+    if current_theme == "light":
+        # slide right
+        def done():
+            toggle_canvas.itemconfig(toggle_bg, fill="#555555")
+            toggle_canvas.itemconfig(toggle_knob, fill="#dddddd")
+            apply_theme()
+        current_theme = "dark"
+        toggle_animation = animate(slide_steps(2), done)
+    else:
+        # slide left
+        def done():
+            toggle_canvas.itemconfig(toggle_bg, fill="#cccccc")
+            toggle_canvas.itemconfig(toggle_knob, fill="#ffffff")
+            apply_theme()
+        current_theme = "light"
+        toggle_animation = animate(slide_steps(-2), done)
+
+
+# =========================
+# AI REQUESTS (BACKGROUND)
+# =========================
+# Model calls run on daemon worker threads (a hung request never keeps the
+# app from closing); results come back through a queue that the Tk loop
+# polls with window.after, so the notepad stays interactive while a request
+# is in flight. Set OPENAI_BASE_URL to point the client at a local stub
+# server.
+def ask_ai(messages, on_done, cached=False, refresh=False):
+    """Start a chat completion; on_done(answer, error) runs on the Tk thread.
+
+    With cached=True the answer is looked up in (and stored to) the on-disk
+    cache first; refresh=True skips the lookup but still stores the new
+    answer. Returns a request handle for cancel_ai(). Cancelled or
+    timed-out requests never call on_done with a late answer.
+    """
+    global ai_poll_job
+    request = {
+        "on_done": on_done,
+        "cancelled": False,
+        "deadline": time.monotonic() + AI_TIMEOUT,
+    }
+
+    def run():
+        key = ai_cache_key(messages) if cached else None
+        answer = read_cached_answer(key) if cached and not refresh else None
+        if answer is not None:
+            ai_results.put((request, answer, None))
+            return
+        try:
+            client = openai.OpenAI(api_key=AI_API_KEY, base_url=AI_BASE_URL, timeout=AI_TIMEOUT)
+            response = client.chat.completions.create(model=AI_MODEL, messages=messages)
+            answer = response.choices[0].message.content
+            ai_results.put((request, answer, None))
+        except Exception as e:
+            ai_results.put((request, None, e))
+            return
+        if cached:
+            try:
+                store_answer(key, answer)
+            except OSError as e:
+                print(f"Could not cache AI answer: {e}")
+
+    threading.Thread(target=run, daemon=True).start()
+    ai_pending.append(request)
+    if ai_poll_job is None:
+        ai_poll_job = window.after(AI_POLL_MS, poll_ai_results)
+    return request
+
+
+# Answers are cached by content: the file name is a hash of the model and
+# every message sent, so an unchanged page asks the same question and gets
+# the stored answer back without a round-trip (or a network). A hit
+# refreshes the file's mtime, and the oldest files are dropped once the
+# cache outgrows AI_CACHE_MAX_BYTES. All of this runs on the worker threads.
+def ai_cache_key(messages):
+    blob = json.dumps([AI_MODEL, messages], sort_keys=True)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def ai_cache_path(key):
+    return os.path.join(notebook.directory, AI_CACHE_DIR, key + ".json")
+
+
+def read_cached_answer(key):
+    path = ai_cache_path(key)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            answer = json.load(f)["answer"]
+        os.utime(path)  # most recently used
+        return answer
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def store_answer(key, answer):
+    directory = os.path.dirname(ai_cache_path(key))
+    with ai_cache_lock:
+        os.makedirs(directory, exist_ok=True)
+        atomic_write(ai_cache_path(key), json.dumps({"answer": answer}))
+
+        entries = []
+        for entry in os.scandir(directory):
+            if entry.name.endswith(".json"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= AI_CACHE_MAX_BYTES:
+                break
+            os.remove(path)
+            total -= size
+
+
+def cancel_ai(request):
+    request["cancelled"] = True
+    if request in ai_pending:
+        ai_pending.remove(request)
+
+
+def poll_ai_results():
+    global ai_poll_job
+    ai_poll_job = None
+
+    while True:
+        try:
+            request, answer, error = ai_results.get_nowait()
+        except queue.Empty:
+            break
+        if request in ai_pending and not request["cancelled"]:
+            ai_pending.remove(request)
+            request["on_done"](answer, error)
+
+    now = time.monotonic()
+    for request in list(ai_pending):
+        if now > request["deadline"]:
+            cancel_ai(request)
+            request["on_done"](None, TimeoutError(f"no answer after {AI_TIMEOUT} s"))
+
+    if ai_pending:
+        ai_poll_job = window.after(AI_POLL_MS, poll_ai_results)
+
+
+# =========================
+# AI CLEANUP BUTTON
+# =========================
+def set_cleanup_pending(pending):
+    if pending:
+        cleanup_button.config(text="Cleaning up… ✖", command=cancel_cleanup)
+    else:
+        cleanup_button.config(text="Clean Up Notes", command=cleanup_notes)
+
+
+def cancel_cleanup():
+    global cleanup_request
+    if cleanup_request is not None:
+        cancel_ai(cleanup_request)
+        cleanup_request = None
+    set_cleanup_pending(False)
+
+
+def cleanup_notes(refresh=False):
+    """Ask the model to tidy the page; answers for an unchanged page come
+    from the cache unless refresh is set (Shift+click)."""
+    global cleanup_request
+    if cleanup_request is not None or page.loading:
+        return
+
+    items_text = []
+
+    for t in page.tasks:
+        status = "done" if t.done else "todo"
+        items_text.append(f"- [{status}] {t.text} (priority {t.priority})")
+
+    for c in page.completed:
+        items_text.append(f"- [done] {c['text']} (priority {c['priority']})")
+
+    for p in page.postits:
+        items_text.append(f"- [note] {p['body']}")
+
+    if not items_text:
+        return
+
+    prompt = (
+        "You are cleaning up a messy personal notepad.\n"
+        "Here are the current items (tasks + notes):\n" +
+        "\n".join(items_text) +
+        "\n\nReturn a cleaned-up, organized list of TASKS ONLY.\n"
+        "Rules:\n"
+        "- Remove duplicates and vague items.\n"
+        "- Merge similar items.\n"
+        "- Keep it concise.\n"
+        "- One task per line.\n"
+        "- Do NOT number them.\n"
+        "- Just output the task lines, nothing else.\n"
+    )
+
+    page_name = notebook.current
+
+    def done(answer, error):
+        global cleanup_request
+        cleanup_request = None
+        set_cleanup_pending(False)
+        if error is not None:
+            cleaned = f"Error calling AI: {error}"
+        else:
+            cleaned = answer.strip()
+        show_cleanup_result(cleaned, page_name)
+
+    cleanup_request = ask_ai(
+        [
+            {"role": "system", "content": "You clean and organize to-do lists."},
+            {"role": "user", "content": prompt},
+        ],
+        done,
+        cached=True,
+        refresh=refresh,
+    )
+    set_cleanup_pending(True)
+
+
+def on_cleanup_shift_click(event):
+    if cleanup_request is None:
+        cleanup_notes(refresh=True)
+    return "break"
+
+
+def show_cleanup_result(cleaned, page_name):
+    """Let the user review the cleaned list before it replaces `page_name`."""
+    popup = tk.Toplevel(window)
+    popup.title("AI Cleaned Tasks")
+    popup.geometry("400x400")
+
+    tk.Label(popup, text="Review and edit the cleaned tasks:", anchor="w").pack(
+        pady=5, padx=10, fill="x"
+    )
+
+    text = tk.Text(popup, wrap="word")
+    text.pack(fill="both", expand=True, padx=10, pady=5)
+    text.insert("1.0", cleaned)
+
+    def apply_changes():
+        lines = [line.strip() for line in text.get("1.0", "end").splitlines() if line.strip()]
+        # the user may have switched pages while the model was thinking
+        if page_name in notebook.pages:
+            switch_tab(page_name)
+        fast_forward_animations()
+        page.replace_tasks(lines)
+        popup.destroy()
+
+    btn_frame = tk.Frame(popup)
+    btn_frame.pack(pady=8)
+
+    tk.Button(btn_frame, text="Apply", command=apply_changes).pack(side="left", padx=5)
+    tk.Button(btn_frame, text="Cancel", command=popup.destroy).pack(side="left", padx=5)
+
+
+# =========================
+# AI CHAT PANEL
+# =========================
+def open_ai_panel():
+    """Resizable AI chat panel with input bar and arrow button."""
+    if hasattr(window, "ai_panel") and window.ai_panel.winfo_exists():
+        window.ai_panel.lift()
+        return
+
+    panel = tk.Toplevel(window)
+    panel.title("AI Assistant")
+    panel.geometry("420x480")
+    panel.minsize(320, 320)
+    window.ai_panel = panel
+
+    panel.grid_rowconfigure(0, weight=1)
+    panel.grid_columnconfigure(0, weight=1)
+
+    chat_frame = tk.Frame(panel, bg="#f3f3f3")
+    chat_frame.grid(row=0, column=0, sticky="nsew")
+
+    scroll_y = tk.Scrollbar(chat_frame)
+    scroll_y.pack(side="right", fill="y")
+
+    chat_log = tk.Text(
+        chat_frame,
+        wrap="word",
+        state="disabled",
+        bg="#ffffff",
+        fg="#222222",
+        font=("Segoe UI", 10),
+        yscrollcommand=scroll_y.set,
+        bd=0,
+        padx=10,
+        pady=10
+    )
+    chat_log.pack(side="left", fill="both", expand=True)
+    scroll_y.config(command=chat_log.yview)
+
+    chat_log.tag_configure("user", foreground="#1a73e8", justify="right")
+    chat_log.tag_configure("ai", foreground="#222222", justify="left")
+    chat_log.tag_configure("pending", foreground="#999999")
+
+    input_frame = tk.Frame(panel, bg="#f3f3f3")
+    input_frame.grid(row=1, column=0, sticky="ew", padx=8, pady=8)
+    panel.grid_rowconfigure(1, weight=0)
+
+    entry = tk.Entry(
+        input_frame,
+        font=("Segoe UI", 10),
+        relief="solid",
+        bd=1
+    )
+    entry.pack(side="left", fill="x", expand=True, ipady=4, padx=(0, 6))
+
+    send_btn = tk.Button(
+        input_frame,
+        text="➤",
+        font=("Segoe UI", 12, "bold"),
+        width=3,
+        relief="flat",
+        bg="#e0e0e0",
+        activebackground="#d0d0d0"
+    )
+    send_btn.pack(side="right")
+
+    pending = {"request": None}
+
+    def cancel_message():
+        if pending["request"] is not None:
+            cancel_ai(pending["request"])
+            show_answer("(cancelled)")
+
+    def show_answer(ai_answer):
+        pending["request"] = None
+        if not panel.winfo_exists():
+            return
+        send_btn.config(text="➤", command=send_message)
+        chat_log.config(state="normal")
+        chat_log.delete("pending.first", "pending.last")
+        chat_log.insert("end", f"AI: {ai_answer}\n\n", "ai")
+        chat_log.config(state="disabled")
+        chat_log.see("end")
+
+    def send_message(event=None):
+        if pending["request"] is not None:
+            return
+        user_msg = entry.get().strip()
+        if not user_msg:
+            return
+        entry.delete(0, tk.END)
+
+        # show user message
+        chat_log.config(state="normal")
+        chat_log.insert("end", f"You: {user_msg}\n\n", "user")
+        chat_log.config(state="disabled")
+        chat_log.see("end")
+
+        # the page's context is kept current as it changes
+        builder = context_builders.get(page)
+        if builder is None:
+            builder = context_builders[page] = ContextBuilder(page, AI_CONTEXT_TOKENS)
+
+        def done(answer, error):
+            show_answer(f"(AI error: {error})" if error is not None else answer)
+
+        pending["request"] = ask_ai(
+            [
+                {
+                    "role": "system",
+                    "content": (
+                        "You are an assistant living inside a clean notebook "
+                        "to-do app. Help the user plan, organize and reflect "
+                        "using their tasks and notes."
+                    ),
+                },
+                {
+                    "role": "system",
+                    "content": "Here are the user's notes and tasks:\n"
+                               + builder.build(),
+                },
+                {"role": "user", "content": user_msg},
+            ],
+            done,
+        )
+
+        # thinking indicator; the send button cancels until the answer is in
+        chat_log.config(state="normal")
+        chat_log.insert("end", "AI is thinking…\n\n", ("ai", "pending"))
+        chat_log.config(state="disabled")
+        chat_log.see("end")
+        send_btn.config(text="✖", command=cancel_message)
+
+    def close_panel():
+        if pending["request"] is not None:
+            cancel_ai(pending["request"])
+        panel.destroy()
+
+    entry.bind("<Return>", send_message)
+    send_btn.config(command=send_message)
+    panel.protocol("WM_DELETE_WINDOW", close_panel)
+
+
+# =========================
+# WINDOW SETUP
+# =========================
+window = tk.Tk()
+window.title("Notepad To-Do")
+window.geometry("950x700")
+window.minsize(650, 450)
+window.configure(bg=COLORS["BG_WINDOW"])
+
+canvas = tk.Canvas(
+    window,
+    bg=COLORS["BG_CANVAS"],
+    highlightthickness=0,
+    yscrollincrement=LINE_HEIGHT
+)
+scrollbar = tk.Scrollbar(window, orient="vertical", command=on_scroll)
+canvas.configure(yscrollcommand=scrollbar.set)
+completed_canvas = tk.Canvas(
+    window,
+    bg=COLORS["BG_COMPLETED"],
+    highlightthickness=0,
+    yscrollincrement=COMPLETED_ROW_HEIGHT
+)
+
+completed_canvas.create_text(
+    10, 20,
+    anchor="w",
+    text="Completed Tasks",
+    font=("Segoe UI", 14, "bold"),
+    fill=COLORS["FG_TEXT"],
+    tags="completed_title"
+)
+
+# top controls
+postit_button = tk.Button(
+    window,
+    text="Add Post-it",
+    command=open_postit_input,
+    bg=COLORS["BTN_BG"],
+    fg=COLORS["BTN_FG"],
+    relief="flat",
+    padx=10,
+    pady=2
+)
+postit_button.place(x=70, y=10)
+
+# theme toggle (top-left)
+toggle_frame = tk.Frame(window, bg=COLORS["BG_WINDOW"])
+toggle_frame.place(x=10, y=10)
+
+toggle_canvas = tk.Canvas(toggle_frame, width=50, height=24, bg=COLORS["BG_WINDOW"], highlightthickness=0)
+toggle_canvas.pack()
+
+toggle_bg = toggle_canvas.create_rectangle(2, 2, 48, 22, fill="#cccccc", outline="")
+toggle_knob = toggle_canvas.create_oval(2, 2, 22, 22, fill="#ffffff", outline="")
+
+toggle_canvas.bind("<Button-1>", slide_toggle)
+
+# tabs frame
+tab_frame = tk.Frame(window, bg=COLORS["BG_WINDOW"])
+tab_frame.place(x=180, y=8)
+
+search_label = tk.Label(
+    window, text="Search:", fg=COLORS["FG_TEXT"], bg=COLORS["BG_WINDOW"], cursor="hand2"
+)
+search_label.place(x=360, y=12)
+search_label.bind("<Button-1>", toggle_fuzzy_search)
+search_entry = tk.Entry(window, width=25)
+search_entry.place(x=420, y=12)
+search_entry.bind("<KeyRelease>", on_search_change)
+search_entry.bind("<Return>", show_search_results)
+
+search_results = tk.Listbox(window, font=("Segoe UI", 10), activestyle="none")
+search_results.bind("<ButtonRelease-1>", on_search_result)
+search_results.bind("<Return>", on_search_result)
+
+cleanup_button = tk.Button(
+    window,
+    text="Clean Up Notes",
+    bg=COLORS["BTN_BG"],
+    fg=COLORS["BTN_FG"],
+    relief="flat",
+    padx=10,
+    pady=2,
+    command=cleanup_notes
+)
+cleanup_button.bind("<Shift-Button-1>", on_cleanup_shift_click)
+
+ai_button = tk.Button(
+    window,
+    text="🤖",
+    font=("Segoe UI", 13),
+    command=open_ai_panel,
+    bg=COLORS["BTN_BG"],
+    fg=COLORS["BTN_FG"],
+    relief="flat"
+)
+ai_button.place(relx=0.97, rely=0.97, anchor="se")
+
+# bindings
+window.protocol("WM_DELETE_WINDOW", on_close)
+window.bind("<Configure>", on_configure)
+window.bind("<Key>", on_key_press)
+window.bind("<<Paste>>", on_paste)
+window.bind("<Escape>", clear_search)
+
+canvas.bind("<Button-1>", on_canvas_click)
+canvas.bind("<Motion>", on_mouse_move)
+canvas.bind("<Button-3>", on_right_click)
+canvas.bind("<B1-Motion>", drag_postit_motion)
+canvas.bind("<ButtonRelease-1>", end_postit_drag)
+canvas.bind("<MouseWheel>", on_mouse_wheel)
+canvas.bind("<Button-4>", on_mouse_wheel)
+canvas.bind("<Button-5>", on_mouse_wheel)
+completed_canvas.bind("<MouseWheel>", on_completed_wheel)
+completed_canvas.bind("<Button-4>", on_completed_wheel)
+completed_canvas.bind("<Button-5>", on_completed_wheel)
+canvas.tag_bind("row", "<Button-1>", on_row_press)
+canvas.tag_bind("postit", "<Button-1>", on_postit_press)
+
+# init
+init_tabs()
+window.update()  # map the window first, so the first paint knows its size
+update_layout()
+apply_theme()
+window.update_idletasks()
+load_tasks()
+notebook.saver.start()
+atexit.register(notebook.flush)
+on_search_change()
+
+window.mainloop()
@@ -0,0 +1,1326 @@
+"""Headless model of the notepad to-do app.
+
+Pages (tasks, completed tasks, post-its), the notebook of pages and their
+on-disk storage live here without any Tk dependency, so they can be driven
+and timed without a display (see bench.py). todolist.py subscribes to the
+current Page and mirrors its changes on the canvas.
+"""
+import bisect
+import collections
+import heapq
+import itertools
+import json
+import mmap
+import os
+import queue
+import re
+import struct
+import threading
+import time
+
+FILENAME = "Tasks.txt"            # task file of the first page
+TABS_FILENAME = "Tasks.tabs.json"  # page names and their task files
+JOURNAL_SUFFIX = ".journal"
+PAGE_SUFFIX = ".page.json"         # completed tasks + post-its of a page
+ARCHIVE_SUFFIX = ".archive"        # older completed tasks, one JSON per line
+COMPLETED_WINDOW = 200        # newest completed tasks kept in memory (and page.json)
+
+JOURNAL_COMPACT_AFTER = 500   # journal records before a new snapshot is taken
+SAVE_COALESCE_MS = 150        # changes within this window share one write
+SAVE_DURABILITY = "batch"     # "none": leave it to the OS, "batch": fsync every commit
+LOAD_CHUNK = 5000             # tasks read per step of a progressive load
+INDEX_CHUNK = 1000            # tasks indexed per step at its end (about a frame)
+
+# binary task file: header, length-prefixed records, offset index, footer
+TASK_FILE_MAGIC = b"TODO"
+TASK_FILE_VERSION = 1
+TASK_FILE_HEADER = struct.Struct("<4sHQI")   # magic, version, seq, task count
+TASK_RECORD = struct.Struct("<IBB")          # text bytes, done, priority
+TASK_FILE_FOOTER = struct.Struct("<Q4s")     # offset of the index, index magic
+TASK_INDEX_MAGIC = b"TIDX"
+
+# notebook geometry (canvas coordinates of the task rows)
+LINE_START_Y = 70
+LINE_HEIGHT = 30
+
+# fuzzy search: how much a query word is worth when it matches a word of
+# the task exactly, as the start of a word, or with one typo
+FUZZY_EXACT = 1.0
+FUZZY_PREFIX = 0.8
+FUZZY_TYPO = 0.6
+FUZZY_TYPO_MIN_LEN = 3        # shorter words have to match exactly or as a prefix
+FUZZY_STAR_POINTS = 5         # per priority star, on a 0-100 match score
+FUZZY_RECENCY_POINTS = 10     # for the newest task, less for older ones
+
+# post-it footprint including its drop shadow, and the hit-test grid
+POSTIT_WIDTH = 144
+POSTIT_HEIGHT = 126
+GRID_CELL = 200
+
+task_ids = itertools.count(1)
+postit_ids = itertools.count(1)
+
+
+class Task:
+    """One task. Slotted, since a page may hold 100k of them."""
+
+    __slots__ = ("id", "text", "done", "priority", "row")
+
+    def __init__(self, text, done=False, priority=0):
+        self.id = next(task_ids)
+        self.text = text
+        self.done = done
+        self.priority = priority
+        self.row = None  # canvas row slot while the UI shows this task
+
+
+def make_postit(text, color, x, y):
+    """Post-it model; x, y is the top-left corner of the note."""
+    return {
+        "id": next(postit_ids),
+        "body": text,
+        "color": color,
+        "x": x,
+        "y": y,
+        "pinned_task": None,
+    }
+
+
+def row_y(index):
+    return LINE_START_Y + index * LINE_HEIGHT
+
+
+def row_at(y, count):
+    """Index of the row closest to canvas y among `count` rows (None if empty)."""
+    if not count:
+        return None
+    return min(count - 1, max(0, round((y - LINE_START_Y) / LINE_HEIGHT)))
+
+
+def grid_cells(x, y):
+    """Hit-test grid cells touched by a post-it whose corner is at x, y."""
+    return [
+        (cx, cy)
+        for cx in range(int(x // GRID_CELL), int((x + POSTIT_WIDTH) // GRID_CELL) + 1)
+        for cy in range(int(y // GRID_CELL), int((y + POSTIT_HEIGHT) // GRID_CELL) + 1)
+    ]
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+WORD_RE = re.compile(r"\w+")
+
+
+def words(text):
+    return WORD_RE.findall(text.lower())
+
+
+def typo_variants(word):
+    """The word and every string one deletion away from it; two words
+    sharing a variant are at most one typo apart (a missing, extra,
+    wrong or swapped letter)."""
+    return {word} | {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+def word_quality(query_word, word):
+    """How well one word of a text matches one query word (0: not at all)."""
+    if word == query_word:
+        return FUZZY_EXACT
+    if word.startswith(query_word):
+        return FUZZY_PREFIX
+    if (len(query_word) >= FUZZY_TYPO_MIN_LEN and len(word) >= FUZZY_TYPO_MIN_LEN
+            and word.isalpha() and typo_variants(query_word) & typo_variants(word)):
+        return FUZZY_TYPO
+    return 0
+
+
+def fuzzy_match_score(text, query_words):
+    """Fuzzy score (0-100) of a text without an index: the best
+    word_quality of each query word, averaged over the query; 0 unless
+    every query word matches."""
+    text_words = set(words(text))
+    total = 0
+    for query_word in query_words:
+        quality = max((word_quality(query_word, w) for w in text_words), default=0)
+        if not quality:
+            return 0
+        total += quality
+    return 100 * total / len(query_words)
+
+
+def match_score(text, query):
+    """How well lowercased `text` matches `query`: 0 for no match, more for
+    the whole text, a match at its start or at a word start, early matches."""
+    position = text.find(query)
+    if position < 0:
+        return 0
+    if len(text) == len(query):
+        return 100
+    if position == 0:
+        return 80
+    start = 60 if not text[position - 1].isalnum() else 40
+    return start - min(position, 20) // 2
+
+
+# =========================
+# STORAGE
+# =========================
+# Every page has its own task file: a binary snapshot (see
+# encode_task_file) plus <file>.journal, where every change after the
+# snapshot is appended as one JSON record. Once enough records pile up they
+# are folded into a new snapshot. The newest completed tasks and the
+# post-its of a page live in <file>.page.json, older completed tasks are
+# appended to <file>.archive, and Tasks.tabs.json lists the pages.
+# Task files in the old text format (text||done||priority lines) are still
+# read, and rewritten in the binary format right after loading.
+def sync_file(f):
+    f.flush()
+    if SAVE_DURABILITY == "batch":
+        os.fsync(f.fileno())
+
+
+def atomic_write(path, data):
+    """Replace a file with `data` (str, or bytes for binary files)."""
+    tmp = path + ".tmp"
+    if isinstance(data, bytes):
+        f = open(tmp, "wb")
+    else:
+        f = open(tmp, "w", encoding="utf-8")
+    with f:
+        f.write(data)
+        sync_file(f)
+    os.replace(tmp, path)
+
+
+def read_journal(path):
+    """Yield journal records in order, stopping at a torn last line."""
+    try:
+        with open(path + JOURNAL_SUFFIX, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    return
+    except FileNotFoundError:
+        return
+
+
+def replay_journal_record(rows, record):
+    op = record["op"]
+    try:
+        if op == "add":
+            rows.append(Task(record["text"], record["done"], record["priority"]))
+        elif op == "add_many":
+            rows.extend(Task(text) for text in record["texts"])
+        elif op == "toggle":
+            rows[record["index"]].done = record["done"]
+        elif op == "priority":
+            rows[record["index"]].priority = record["priority"]
+        elif op == "delete":
+            del rows[record["index"]]
+    except IndexError:
+        pass
+
+
+def encode_task_file(rows, seq):
+    """Binary snapshot of (text, done, priority) rows covering journal `seq`.
+
+    A header (magic, version, seq, count), then one record per task: its
+    UTF-8 length, done and priority, then the text itself, so any text
+    (with "||", spaces or newlines) round-trips. The file ends with the
+    offset of every record and a footer pointing at those offsets, so a
+    reader can jump straight to any row.
+    """
+    parts = [TASK_FILE_HEADER.pack(TASK_FILE_MAGIC, TASK_FILE_VERSION, seq, len(rows))]
+    offsets = []
+    position = TASK_FILE_HEADER.size
+    for text, done, priority in rows:
+        data = text.encode("utf-8")
+        offsets.append(position)
+        parts.append(TASK_RECORD.pack(len(data), bool(done), priority))
+        parts.append(data)
+        position += TASK_RECORD.size + len(data)
+    parts.append(struct.pack(f"<{len(offsets)}Q", *offsets))
+    parts.append(TASK_FILE_FOOTER.pack(position, TASK_INDEX_MAGIC))
+    return b"".join(parts)
+
+
+def is_task_file(path):
+    """True if `path` is a binary task file (False for old text files)."""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(TASK_FILE_MAGIC)) == TASK_FILE_MAGIC
+    except FileNotFoundError:
+        return False
+
+
+class TaskFile:
+    """Random access to a binary task file through mmap.
+
+    Rows are decoded only when asked for, so the first screenful can be
+    read without touching the rest of the file. If the trailing index is
+    damaged the records are walked once from the start instead.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, self.seq, self.count = TASK_FILE_HEADER.unpack_from(self.map, 0)
+            if version > TASK_FILE_VERSION:
+                raise ValueError(f"{path} was written by a newer version (format {version})")
+            self.index = None
+            self.offsets = None
+            end = len(self.map) - TASK_FILE_FOOTER.size
+            if end >= TASK_FILE_HEADER.size:
+                index, index_magic = TASK_FILE_FOOTER.unpack_from(self.map, end)
+                if index_magic == TASK_INDEX_MAGIC and index + 8 * self.count == end:
+                    self.index = index
+            if self.index is None:
+                self.offsets = self.scan()
+        except BaseException:
+            self.map.close()
+            raise
+
+    def scan(self):
+        """Record offsets found by walking the file; stops at a torn record."""
+        offsets = []
+        position = TASK_FILE_HEADER.size
+        while len(offsets) < self.count and position + TASK_RECORD.size <= len(self.map):
+            length = TASK_RECORD.unpack_from(self.map, position)[0]
+            if position + TASK_RECORD.size + length > len(self.map):
+                break
+            offsets.append(position)
+            position += TASK_RECORD.size + length
+        self.count = len(offsets)
+        return offsets
+
+    def __len__(self):
+        return self.count
+
+    def offset(self, i):
+        if self.offsets is not None:
+            return self.offsets[i]
+        return struct.unpack_from("<Q", self.map, self.index + 8 * i)[0]
+
+    def tasks(self, start=0, stop=None):
+        """Task records for rows start..stop-1."""
+        stop = self.count if stop is None else min(stop, self.count)
+        rows = []
+        if start >= stop:
+            return rows
+        position = self.offset(start)
+        for _ in range(start, stop):
+            length, done, priority = TASK_RECORD.unpack_from(self.map, position)
+            position += TASK_RECORD.size
+            rows.append(Task(self.map[position:position + length].decode("utf-8"),
+                             bool(done), priority))
+            position += length
+        return rows
+
+    def close(self):
+        self.map.close()
+
+
+def read_snapshot(path, chunk=None):
+    """Yield (tasks, seq) of a snapshot file, `chunk` tasks at a time
+    (all of them at once if None)."""
+    if not is_task_file(path):
+        yield from read_text_snapshot(path, chunk)
+        return
+    task_file = TaskFile(path)
+    try:
+        # an empty page still yields once, for its seq
+        step = chunk or len(task_file) or 1
+        for start in range(0, max(len(task_file), 1), step):
+            yield task_file.tasks(start, start + step), task_file.seq
+    finally:
+        task_file.close()
+
+
+def read_text_snapshot(path, chunk=None):
+    """read_snapshot for the old text format ("#seq N", then
+    text||done||priority lines, or headerless text||done lines)."""
+    rows = []
+    seq = 0
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("#seq "):
+                    seq = int(line[5:])
+                    continue
+                parts = line.strip().split("||")
+                if len(parts) == 2:
+                    text, done = parts
+                    priority = 0
+                elif len(parts) == 3:
+                    text, done, priority = parts
+                    priority = int(priority)
+                else:
+                    continue
+                rows.append(Task(text, done == "True", priority))
+                if len(rows) == chunk:
+                    yield rows, seq
+                    rows = []
+    except FileNotFoundError:
+        pass
+    if rows:
+        yield rows, seq
+
+
+def read_page_extras(path):
+    try:
+        with open(path + PAGE_SUFFIX, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {"completed": [], "postits": []}
+
+
+def read_tab_index(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        # first run (or a Tasks.txt from before tabs were saved)
+        return {"tabs": [{"name": "Page 1", "file": FILENAME}], "current": "Page 1"}
+
+
+class SaveWorker:
+    """Background writer shared by all pages of a notebook.
+
+    The UI thread never touches the files: it queues journal records,
+    snapshots and whole-file writes, and the worker groups everything
+    arriving within SAVE_COALESCE_MS into one commit.
+    """
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.thread = None
+        self.snapshot_seqs = {}  # task file -> seq covered by its snapshot on disk
+        self.archive_sizes = {}  # task file -> bytes of its archive on disk
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+
+    def put(self, item):
+        self.queue.put(item)
+
+    def flush(self, timeout=5):
+        """Block until everything queued so far is on disk (used on exit)."""
+        if self.thread is None or not self.thread.is_alive():
+            return
+        done = threading.Event()
+        self.queue.put(("flush", done))
+        done.wait(timeout)
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + SAVE_COALESCE_MS / 1000
+
+            # collect the rest of the burst; a flush request commits right away
+            while batch[-1][0] != "flush":
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                self.commit(batch)
+            except Exception as e:
+                # a bad batch is dropped; the worker keeps serving later saves
+                print(f"Could not save tasks: {e}")
+            finally:
+                for item in batch:
+                    if item[0] == "flush":
+                        item[1].set()
+
+    def commit(self, batch):
+        """Group commit: one append per journal or archive, newest snapshot / file per path."""
+        appends = {}
+        archives = {}
+        archive_resets = set()
+        snapshots = {}
+        files = {}
+        for item in batch:
+            if item[0] == "journal":
+                appends.setdefault(item[1], []).append(item[2])
+            elif item[0] == "archive":
+                archives.setdefault(item[1], []).append(item[2])
+            elif item[0] == "archive_reset":
+                # earlier appends in this burst are cut off anyway
+                archives[item[1]] = []
+                archive_resets.add(item[1])
+            elif item[0] == "snapshot":
+                _, path, rows, seq = item
+                if seq >= snapshots.get(path, (None, -1))[1]:
+                    snapshots[path] = (rows, seq)
+            elif item[0] == "file":
+                files[item[1]] = item[2]
+
+        for path, lines in appends.items():
+            with open(path + JOURNAL_SUFFIX, "a", encoding="utf-8") as f:
+                f.write("".join(lines))
+                sync_file(f)
+
+        # archives go first: a crash before page.json is rewritten leaves
+        # duplicates, which the next load trims, never lost entries
+        for path, chunks in archives.items():
+            with open(path + ARCHIVE_SUFFIX, "wb" if path in archive_resets else "ab") as f:
+                f.write(b"".join(chunks))
+                sync_file(f)
+                self.archive_sizes[path] = f.tell()
+
+        # only the newest snapshot in a burst is worth writing
+        for path, (rows, seq) in snapshots.items():
+            if seq >= self.snapshot_seqs.get(path, 0):
+                self.install_snapshot(path, rows, seq)
+
+        for path, text in files.items():
+            atomic_write(path, text)
+
+    def install_snapshot(self, path, rows, seq):
+        """Atomically replace a snapshot and drop the journal records it covers."""
+        atomic_write(path, encode_task_file(rows, seq))
+        self.snapshot_seqs[path] = seq
+
+        tail = [json.dumps(r) + "\n" for r in read_journal(path) if r["seq"] > seq]
+        atomic_write(path + JOURNAL_SUFFIX, "".join(tail))
+
+
+# =========================
+# PAGE
+# =========================
+class Page:
+    """One notebook page: its tasks, completed list and post-its.
+
+    Every change is persisted through the notebook's SaveWorker and then
+    announced to subscribers as listener(event, *args):
+
+        ("add", task)                    task appended
+        ("extend", tasks)                many tasks appended at once (paste)
+        ("change", task)                 done / priority changed
+        ("remove", task, index, notes)   task deleted; notes were unpinned
+        ("completed", entry)             entry appended to the completed list
+        ("reset",)                       the whole page was replaced
+        ("loading",) / ("loaded",)       see load_steps
+        ("postits",)                     a post-it was added or removed
+    """
+
+    def __init__(self, path, saver):
+        self.path = path
+        self.saver = saver
+        self.tasks = []
+        self.completed = []     # newest completed, list of {"text": str, "priority": int}
+        self.archived = 0       # older completed entries in the archive file
+        self.archive_bytes = 0  # archive length that goes with page.json
+        self.archive_offsets = None  # line offsets in the archive, read on demand
+        self.postits = []
+        self.pins = {}          # task id -> post-its pinned to that task
+        self.postits_by_id = {}
+        self.postit_grid = {}   # (cx, cy) grid cell -> ids of post-its touching it
+        self.tasks_by_id = {}
+        self.trigram_index = {}  # trigram -> set of task ids
+        self.last_search = ("", None)  # (query, ids found) of the last search()
+        self.word_index = None  # word -> set of task ids, built by the first fuzzy search
+        self.typo_index = {}    # typo variant -> words having it
+        self.vocabulary = None  # sorted words of word_index, built on demand
+        self.journal_seq = 0    # seq of the last journal record queued
+        self.journal_pending = 0  # records queued since the last snapshot
+        self.loading = False    # True while load_steps() is filling the page
+        self.listeners = []
+
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def emit(self, event, *args):
+        for listener in list(self.listeners):
+            listener(event, *args)
+
+    # ---------------- persistence ----------------
+    def load(self):
+        """Read the whole page from disk."""
+        for _ in self.load_steps(chunk=None):
+            pass
+
+    def load_steps(self, chunk=LOAD_CHUNK):
+        """Load the page, yielding after each `chunk` tasks of the snapshot.
+
+        The extras come first, so after the first yield a UI can paint the
+        post-its, the completed list and the top of the task list while the
+        rest is read; "loading" is emitted for every later chunk. Journal
+        records are replayed at the end and the search index is built
+        INDEX_CHUNK tasks per step, then "loaded" is emitted. Edits have to
+        wait until self.loading is False.
+        """
+        self.loading = True
+        self.tasks = []
+
+        extras = read_page_extras(self.path)
+        self.completed = [
+            {"text": c["text"], "priority": c["priority"]} for c in extras["completed"]
+        ]
+        self.archive_offsets = None
+        if "archive_bytes" in extras:
+            self.archived = extras.get("archived", 0)
+            self.archive_bytes = extras["archive_bytes"]
+            self.trim_archive()
+        else:
+            # page.json missing or unreadable: keep the archive as it is
+            self.adopt_archive()
+        self.saver.archive_sizes[self.path] = self.archive_bytes
+        self.postits = [
+            make_postit(p["text"], p["color"], p["x"], p["y"]) for p in extras["postits"]
+        ]
+        self.pins = {}
+        self.rebuild_postit_grid()
+        # pins are restored once all tasks are read
+        pinned = [
+            (note, p["pinned"]) for note, p in zip(self.postits, extras["postits"])
+            if p.get("pinned") is not None
+        ]
+
+        legacy = os.path.exists(self.path) and not is_task_file(self.path)
+        seq = 0
+        for rows, seq in read_snapshot(self.path, chunk):
+            self.tasks.extend(rows)
+            if len(self.tasks) > len(rows):
+                self.emit("loading")
+            yield
+
+        self.saver.snapshot_seqs[self.path] = seq
+        for record in read_journal(self.path):
+            if record["seq"] > seq:
+                replay_journal_record(self.tasks, record)
+                seq = record["seq"]
+        self.journal_seq = seq
+        self.journal_pending = 0
+        if legacy:
+            self.save_tasks()  # migrate to the binary format
+        for note, index in pinned:
+            if index < len(self.tasks):
+                task = self.tasks[index]
+                note["pinned_task"] = task
+                self.pins.setdefault(task.id, []).append(note)
+
+        if chunk is None:
+            self.rebuild_index()
+        else:
+            yield from self.index_steps(INDEX_CHUNK)
+        self.loading = False
+        self.emit("loaded")
+
+    def journal(self, op, **fields):
+        """Record one change (add / add_many / toggle / priority / delete)
+        as a small append."""
+        self.journal_seq += 1
+        record = {"seq": self.journal_seq, "op": op, **fields}
+        self.saver.put(("journal", self.path, json.dumps(record) + "\n"))
+
+        self.journal_pending += 1
+        if self.journal_pending >= JOURNAL_COMPACT_AFTER:
+            self.save_tasks()
+
+    def save_tasks(self):
+        """Queue a full snapshot of the tasks (compaction / page replaced)."""
+        self.journal_pending = 0
+        rows = [(t.text, t.done, t.priority) for t in self.tasks]
+        self.saver.put(("snapshot", self.path, rows, self.journal_seq))
+
+    def save_extras(self):
+        """Queue the completed list and post-its."""
+        extras = {
+            "completed": self.completed,
+            "archived": self.archived,
+            "archive_bytes": self.archive_bytes,
+            "postits": [
+                {"text": p["body"], "color": p["color"], "x": p["x"], "y": p["y"],
+                 "pinned": None if p["pinned_task"] is None
+                 else self.tasks.index(p["pinned_task"])}
+                for p in self.postits
+            ],
+        }
+        self.saver.put(("file", self.path + PAGE_SUFFIX, json.dumps(extras)))
+
+    # ---------------- tasks ----------------
+    def add_task(self, text, done=False, priority=0):
+        """Append a new task at the bottom of the page."""
+        task = Task(text, done, priority)
+        self.tasks.append(task)
+        self.index_task(task)
+        self.journal("add", text=text, done=done, priority=priority)
+        self.emit("add", task)
+        return task
+
+    def add_tasks(self, texts):
+        """Append many open tasks at once (paste): one journal record and
+        one "extend" event for the whole batch."""
+        tasks = [Task(text) for text in texts]
+        if not tasks:
+            return tasks
+        self.tasks.extend(tasks)
+        for task in tasks:
+            self.index_task(task)
+        self.journal("add_many", texts=list(texts))
+        self.emit("extend", tasks)
+        return tasks
+
+    def set_done(self, task, done):
+        task.done = done
+        self.journal("toggle", index=self.tasks.index(task), done=done)
+        self.emit("change", task)
+
+    def cycle_priority(self, task):
+        task.priority = (task.priority + 1) % 4
+        self.journal("priority", index=self.tasks.index(task), priority=task.priority)
+        self.emit("change", task)
+
+    def delete_task(self, task):
+        # unpin post-its attached to this task
+        notes = list(self.pins.get(task.id, ()))
+        for note in notes:
+            self.unpin_postit(note)
+
+        index = self.tasks.index(task)
+        del self.tasks[index]
+        self.unindex_task(task)
+        self.journal("delete", index=index)
+
+        # notes pinned further down follow their task up one line
+        moved = False
+        for pinned in self.pins.values():
+            for note in pinned:
+                if note["y"] > row_y(index) - 40:
+                    self.place_postit(note, note["x"], note["y"] - LINE_HEIGHT)
+                    moved = True
+
+        self.emit("remove", task, index, notes)
+        if notes or moved:
+            self.save_extras()  # positions and pinned rows changed
+
+    def complete_task(self, task):
+        """Move a task to the completed list."""
+        self.add_completed(task.text, task.priority)
+        self.delete_task(task)
+        self.save_extras()
+
+    def replace_tasks(self, lines):
+        """Replace the whole page with fresh open tasks (AI cleanup); the
+        completed list, its archive and the post-its are cleared."""
+        self.tasks = [Task(line) for line in lines]
+        self.completed = []
+        self.archived = 0
+        self.archive_bytes = 0
+        self.archive_offsets = []
+        self.saver.put(("archive_reset", self.path))
+        self.postits = []
+        self.pins = {}
+        self.rebuild_index()
+        self.rebuild_postit_grid()
+        self.save_tasks()
+        self.save_extras()
+        self.emit("reset")
+
+    # ---------------- completed ----------------
+    def add_completed(self, text, priority=0):
+        """Append to the completed list; the oldest entries beyond
+        COMPLETED_WINDOW move to the archive (the caller saves the extras)."""
+        entry = {"text": text, "priority": priority}
+        self.completed.append(entry)
+        self.emit("completed", entry)
+        if len(self.completed) > COMPLETED_WINDOW:
+            self.archive_completed(len(self.completed) - COMPLETED_WINDOW)
+        return entry
+
+    def archive_completed(self, count):
+        """Move the `count` oldest completed entries to the archive file."""
+        lines = [(json.dumps(e) + "\n").encode("utf-8") for e in self.completed[:count]]
+        del self.completed[:count]
+        self.saver.put(("archive", self.path, b"".join(lines)))
+
+        if self.archive_offsets is not None:
+            for line in lines:
+                self.archive_offsets.append(self.archive_bytes)
+                self.archive_bytes += len(line)
+        else:
+            self.archive_bytes += sum(len(line) for line in lines)
+        self.archived += count
+
+    def trim_archive(self):
+        """Cut archive lines page.json does not know about (see SaveWorker.commit)."""
+        try:
+            if os.path.getsize(self.path + ARCHIVE_SUFFIX) > self.archive_bytes:
+                os.truncate(self.path + ARCHIVE_SUFFIX, self.archive_bytes)
+        except OSError:
+            pass
+
+    def adopt_archive(self):
+        """Take the archive on disk as it is, when page.json has no record of it."""
+        try:
+            with open(self.path + ARCHIVE_SUFFIX, "rb") as f:
+                self.archived = sum(1 for _ in f)
+                self.archive_bytes = f.tell()
+        except OSError:
+            self.archived = 0
+            self.archive_bytes = 0
+
+    def read_archive(self, start, count):
+        """Archived entries [start, start + count), oldest first."""
+        count = min(count, self.archived - start)
+        if count <= 0:
+            return []
+        # wait for the worker only if the entries are still queued
+        if self.archive_offsets is not None and start + count < len(self.archive_offsets):
+            end = self.archive_offsets[start + count]
+        else:
+            end = self.archive_bytes
+        if self.saver.archive_sizes.get(self.path, 0) < end:
+            self.saver.flush()
+        try:
+            with open(self.path + ARCHIVE_SUFFIX, "rb") as f:
+                if self.archive_offsets is None:
+                    # one scan, then every page is a seek
+                    self.archive_offsets = []
+                    offset = 0
+                    for line in f:
+                        if offset >= self.archive_bytes:
+                            break
+                        self.archive_offsets.append(offset)
+                        offset += len(line)
+                f.seek(self.archive_offsets[start])
+                return [json.loads(f.readline()) for _ in range(count)]
+        except (OSError, IndexError, ValueError):
+            return []
+
+    # ---------------- post-its ----------------
+    # Post-its are also filed in a uniform grid of GRID_CELL squares, so a
+    # point lookup only checks the few notes sharing its cell.
+    def add_postit(self, text, color, x, y):
+        note = make_postit(text, color, x, y)
+        self.postits.append(note)
+        self.index_postit(note)
+        self.save_extras()
+        self.emit("postits")
+        return note
+
+    def move_postit(self, note, x, y):
+        self.place_postit(note, x, y)
+        self.save_extras()
+
+    def place_postit(self, note, x, y):
+        """Move a note in the model and the grid, without saving."""
+        self.unindex_postit(note)
+        note["x"] = x
+        note["y"] = y
+        self.index_postit(note)
+
+    def remove_postit(self, note):
+        if note["pinned_task"] is not None:
+            self.unpin_postit(note)
+        self.unindex_postit(note)
+        self.postits.remove(note)
+        self.save_extras()
+        self.emit("postits")
+
+    def index_postit(self, note):
+        self.postits_by_id[note["id"]] = note
+        for cell in grid_cells(note["x"], note["y"]):
+            self.postit_grid.setdefault(cell, set()).add(note["id"])
+
+    def unindex_postit(self, note):
+        self.postits_by_id.pop(note["id"], None)
+        for cell in grid_cells(note["x"], note["y"]):
+            ids = self.postit_grid.get(cell)
+            if ids is not None:
+                ids.discard(note["id"])
+                if not ids:
+                    del self.postit_grid[cell]
+
+    def rebuild_postit_grid(self):
+        self.postits_by_id = {}
+        self.postit_grid = {}
+        for note in self.postits:
+            self.index_postit(note)
+
+    def postit_at(self, x, y):
+        """The topmost post-it covering canvas point x, y, or None."""
+        hits = [
+            self.postits_by_id[i]
+            for i in self.postit_grid.get((int(x // GRID_CELL), int(y // GRID_CELL)), ())
+        ]
+        hits = [
+            n for n in hits
+            if n["x"] <= x <= n["x"] + POSTIT_WIDTH and n["y"] <= y <= n["y"] + POSTIT_HEIGHT
+        ]
+        # notes created later are drawn on top
+        return max(hits, key=lambda n: n["id"]) if hits else None
+
+    def nearest_row(self, y):
+        """Index of the task row closest to canvas y (None on an empty page)."""
+        return row_at(y, len(self.tasks))
+
+    def pin_postit(self, note, index):
+        """Pin a note to tasks[index]; it snaps just above that row."""
+        task = self.tasks[index]
+        note["pinned_task"] = task
+        self.pins.setdefault(task.id, []).append(note)
+        self.move_postit(note, note["x"], row_y(index) - 40)
+
+    def unpin_postit(self, note):
+        task_id = note["pinned_task"].id
+        self.pins[task_id].remove(note)
+        if not self.pins[task_id]:
+            del self.pins[task_id]
+        note["pinned_task"] = None
+
+    # ---------------- search ----------------
+    # A trigram index over the lowercased task text narrows candidates
+    # before the substring check.
+    def index_task(self, task):
+        self.tasks_by_id[task.id] = task
+        self.last_search = ("", None)
+        for gram in trigrams(task.text.lower()):
+            self.trigram_index.setdefault(gram, set()).add(task.id)
+        if self.word_index is not None:
+            self.index_words(task)
+
+    def index_words(self, task):
+        for word in set(words(task.text)):
+            ids = self.word_index.get(word)
+            if ids is None:
+                ids = self.word_index[word] = set()
+                self.vocabulary = None
+                if len(word) >= FUZZY_TYPO_MIN_LEN and word.isalpha():
+                    for variant in typo_variants(word):
+                        self.typo_index.setdefault(variant, set()).add(word)
+            ids.add(task.id)
+
+    def unindex_task(self, task):
+        self.tasks_by_id.pop(task.id, None)
+        self.last_search = ("", None)
+        for gram in trigrams(task.text.lower()):
+            ids = self.trigram_index.get(gram)
+            if ids is not None:
+                ids.discard(task.id)
+                if not ids:
+                    del self.trigram_index[gram]
+        if self.word_index is not None:
+            self.unindex_words(task)
+
+    def unindex_words(self, task):
+        for word in set(words(task.text)):
+            ids = self.word_index.get(word)
+            if ids is None:
+                continue
+            ids.discard(task.id)
+            if not ids:
+                del self.word_index[word]
+                self.vocabulary = None
+                for variant in typo_variants(word):
+                    similar = self.typo_index.get(variant)
+                    if similar is not None:
+                        similar.discard(word)
+                        if not similar:
+                            del self.typo_index[variant]
+
+    def rebuild_index(self):
+        for _ in self.index_steps(max(1, len(self.tasks))):
+            pass
+
+    def index_steps(self, step):
+        """rebuild_index, yielding after every `step` tasks."""
+        self.trigram_index = {}
+        self.word_index = None
+        self.tasks_by_id = {}
+        self.last_search = ("", None)
+        for start in range(0, len(self.tasks), step):
+            for task in self.tasks[start:start + step]:
+                self.index_task(task)
+            yield
+
+    def build_word_index(self):
+        self.word_index = {}
+        self.typo_index = {}
+        self.vocabulary = None
+        for t in self.tasks:
+            self.index_words(t)
+
+    def find(self, query, within=None):
+        """Ids of tasks whose text contains `query` (already lowercased).
+
+        `within` narrows the search to a previous result, valid when the
+        query only grew since it was computed.
+        """
+        if within is not None:
+            candidates = within
+        elif len(query) >= 3:
+            postings = sorted(
+                (self.trigram_index.get(gram, set()) for gram in trigrams(query)),
+                key=len
+            )
+            candidates = set.intersection(*postings)
+        else:
+            candidates = self.tasks_by_id.keys()
+
+        return {i for i in candidates if query in self.tasks_by_id[i].text.lower()}
+
+    def fuzzy_find(self, query, k=50):
+        """The `k` best tasks for a typo-tolerant `query`, as (score, task),
+        best first.
+
+        Every query word is looked up in the word index as a whole word,
+        as the start of words (the word being typed) and one typo away
+        (typo_index). A task has to match every query word and scores the
+        best word_quality of each; stars and recency (newer tasks have
+        higher ids) add a little on top. A heap keeps only the top k.
+        Nothing is found while the page is still loading (the search
+        index is built when loading ends).
+        """
+        query_words = words(query)
+        if not query_words or not self.tasks or self.loading:
+            return []
+        if self.word_index is None:
+            self.build_word_index()
+        if self.vocabulary is None:
+            self.vocabulary = sorted(self.word_index)
+        vocabulary = self.vocabulary
+
+        totals = None  # task id -> summed quality, for tasks matching every word
+        for query_word in query_words:
+            matched = {}  # word -> quality
+            i = bisect.bisect_left(vocabulary, query_word)
+            while i < len(vocabulary) and vocabulary[i].startswith(query_word):
+                word = vocabulary[i]
+                matched[word] = FUZZY_EXACT if word == query_word else FUZZY_PREFIX
+                i += 1
+            if len(query_word) >= FUZZY_TYPO_MIN_LEN:
+                for variant in typo_variants(query_word):
+                    for word in self.typo_index.get(variant, ()):
+                        matched.setdefault(word, FUZZY_TYPO)
+
+            best = {}
+            for word, quality in sorted(matched.items(), key=lambda item: item[1]):
+                best.update(dict.fromkeys(self.word_index[word], quality))
+            if totals is None:
+                totals = best
+            else:
+                totals = {task_id: totals[task_id] + best[task_id]
+                          for task_id in totals.keys() & best.keys()}
+            if not totals:
+                return []
+
+        # Stars and recency add less than `bonus` points, so a task can
+        # only make the top k if its match is within that of the k-th best.
+        scale = 100 / len(query_words)
+        bonus = 3 * FUZZY_STAR_POINTS + FUZZY_RECENCY_POINTS
+        levels = sorted(collections.Counter(totals.values()).items(), reverse=True)
+        seen = 0
+        for cutoff, count in levels:
+            seen += count
+            if seen >= k:
+                break
+        floor = cutoff - bonus / scale
+        candidates = sum(count for quality, count in levels if quality >= floor)
+
+        first = self.tasks[0].id
+        recency = FUZZY_RECENCY_POINTS / max(1, self.tasks[-1].id - first)
+        tasks_by_id = self.tasks_by_id
+        if levels[0][1] * candidates < 2 * k * len(self.tasks):
+            scored = [
+                (quality * scale + FUZZY_STAR_POINTS * tasks_by_id[task_id].priority
+                 + (task_id - first) * recency, task_id)
+                for task_id, quality in totals.items() if quality >= floor
+            ]
+            best = heapq.nlargest(k, scored)
+        else:
+            # Many tasks share the best match (a short query): walk from the
+            # newest task down and stop once even a best match with all
+            # stars would be too old to beat the k-th best found so far.
+            top = levels[0][0] * scale + 3 * FUZZY_STAR_POINTS
+            heap = []
+            for task in reversed(self.tasks):
+                quality = totals.get(task.id)
+                if quality is None or quality < floor:
+                    continue
+                age_points = (task.id - first) * recency
+                if len(heap) == k and top + age_points < heap[0][0]:
+                    break
+                item = (quality * scale + FUZZY_STAR_POINTS * task.priority + age_points, task.id)
+                if len(heap) < k:
+                    heapq.heappush(heap, item)
+                elif item > heap[0]:
+                    heapq.heapreplace(heap, item)
+            best = sorted(heap, reverse=True)
+        return [(score, tasks_by_id[task_id]) for score, task_id in best]
+
+    def search(self, query, fuzzy=False, k=50):
+        """Scored hits for `query` (lowercased) among the open tasks, the
+        completed entries in memory and the post-its of this page, as
+        (score, kind, text, target) with kind "task" (target: the Task),
+        "completed" (its position) or "postit" (the note). Only the best k
+        tasks are returned. With fuzzy=True they come from fuzzy_find and
+        the rest is scored by fuzzy_match_score."""
+        hits = []
+        if fuzzy:
+            query_words = words(query)
+            if not query_words:
+                return hits
+            for score, task in self.fuzzy_find(query, k):
+                hits.append((score, "task", task.text, task))
+
+            def score_text(text):
+                return fuzzy_match_score(text, query_words)
+        else:
+            # while typing, the query grows: narrow the last result
+            last_query, last_ids = self.last_search
+            within = last_ids if last_query and last_query in query else None
+            ids = self.find(query, within)
+            self.last_search = (query, ids)
+
+            tasks_by_id = self.tasks_by_id
+            scored = [
+                (match_score(tasks_by_id[task_id].text.lower(), query)
+                 + 5 * tasks_by_id[task_id].priority, task_id)
+                for task_id in ids
+            ]
+            for score, task_id in heapq.nlargest(k, scored):
+                task = tasks_by_id[task_id]
+                hits.append((score, "task", task.text, task))
+
+            def score_text(text):
+                return match_score(text.lower(), query)
+
+        for position, entry in enumerate(self.completed, self.archived):
+            score = score_text(entry["text"])
+            if score:
+                hits.append((score - 10, "completed", entry["text"], position))
+        for note in self.postits:
+            score = score_text(note["body"])
+            if score:
+                hits.append((score, "postit", note["body"], note))
+        return hits
+
+
+# =========================
+# AI CONTEXT
+# =========================
+def estimate_tokens(text):
+    """Rough token count (about four characters per token for English)."""
+    return len(text) // 4 + 1
+
+
+class ContextBuilder:
+    """The notes part of the AI chat prompt for one page, within a token budget.
+
+    It follows the page's events instead of re-reading the page per
+    message: every task keeps a ready-made line in a bucket per priority,
+    and the joined text is cached until something changes. Open tasks go
+    in first, highest priority first and in page order within a priority,
+    then the post-its, then the newest completed tasks; whatever does not
+    fit is summarized as a count.
+    """
+
+    def __init__(self, page, budget):
+        self.page = page
+        self.budget = budget
+        self.buckets = {}   # priority -> {task id: (line, tokens)} of open tasks
+        self.unsorted = set()  # priorities whose bucket left page (id) order
+        self.text = None    # the built context; None once it is stale
+        page.subscribe(self.on_event)
+        self.reset()
+
+    def reset(self):
+        self.buckets = {priority: {} for priority in range(4)}
+        self.unsorted = set()
+        for task in self.page.tasks:
+            self.file_task(task)
+        self.text = None
+
+    def file_task(self, task):
+        """File (or refile) a task's line; a task staying in its bucket
+        keeps its place there."""
+        for priority, bucket in self.buckets.items():
+            if task.id in bucket and (task.done or priority != task.priority):
+                del bucket[task.id]
+        if task.done:
+            return
+        bucket = self.buckets[task.priority]
+        # task ids grow in page order: an older task arriving late is out of place
+        if task.id not in bucket and bucket and task.id < next(reversed(bucket)):
+            self.unsorted.add(task.priority)
+        line = f"[Task] {task.text}" + (f" (priority {task.priority})" if task.priority else "")
+        bucket[task.id] = (line, estimate_tokens(line))
+
+    def on_event(self, event, *args):
+        if event in ("add", "change"):
+            self.file_task(args[0])
+        elif event == "extend":
+            for task in args[0]:
+                self.file_task(task)
+        elif event == "remove":
+            self.buckets[args[0].priority].pop(args[0].id, None)
+        elif event in ("reset", "loaded"):
+            self.reset()
+        self.text = None
+
+    def build(self):
+        """The context text, rebuilt only if the page changed since last time."""
+        if self.text is None:
+            self.text = "\n".join(self.compose())
+        return self.text
+
+    def compose(self):
+        lines = []
+        left = self.budget
+        for priority in self.unsorted:
+            self.buckets[priority] = dict(sorted(self.buckets[priority].items()))
+        self.unsorted.clear()
+
+        left_out = {}  # priority -> open tasks that did not fit
+        for priority in (3, 2, 1, 0):
+            taken = 0
+            if not left_out:
+                for line, tokens in self.buckets[priority].values():
+                    if tokens > left:
+                        break
+                    lines.append(line)
+                    left -= tokens
+                    taken += 1
+            if taken < len(self.buckets[priority]):
+                left_out[priority] = len(self.buckets[priority]) - taken
+        if left_out:
+            counts = ", ".join(
+                f"{count} with priority {priority}" if priority else f"{count} without priority"
+                for priority, count in left_out.items()
+            )
+            lines.append(f"[Task] ... and {sum(left_out.values())} more open tasks ({counts})")
+            return lines
+
+        for note in self.page.postits:
+            line = f"[Note] {note['body']}"
+            if estimate_tokens(line) > left:
+                break
+            lines.append(line)
+            left -= estimate_tokens(line)
+
+        done_count = self.page.archived + len(self.page.completed)
+        shown = 0
+        for entry in reversed(self.page.completed):
+            line = f"[Done] {entry['text']}"
+            if estimate_tokens(line) > left:
+                break
+            lines.append(line)
+            left -= estimate_tokens(line)
+            shown += 1
+        if shown < done_count:
+            lines.append(f"[Done] ... and {done_count - shown} older completed tasks")
+        return lines
+
+
+# =========================
+# NOTEBOOK (TABS)
+# =========================
+class Notebook:
+    """The named pages of a notebook; pages are read from disk when opened."""
+
+    def __init__(self, directory="."):
+        self.directory = directory
+        self.saver = SaveWorker()
+        self.pages = {}    # name -> Page, or None until opened
+        self.files = {}    # name -> task file of that page
+        self.current = None
+
+    def path(self, filename):
+        return os.path.join(self.directory, filename)
+
+    def load_index(self):
+        """Read the page list only; no page content is loaded yet."""
+        index = read_tab_index(self.path(TABS_FILENAME))
+        for entry in index["tabs"]:
+            self.pages[entry["name"]] = None
+            self.files[entry["name"]] = entry["file"]
+        self.current = index["current"] if index["current"] in self.pages else next(iter(self.pages))
+
+    def save_index(self):
+        index = {
+            "tabs": [{"name": name, "file": self.files[name]} for name in self.pages],
+            "current": self.current,
+        }
+        self.saver.put(("file", self.path(TABS_FILENAME), json.dumps(index)))
+
+    def page(self, name=None, progressive=False):
+        """The Page called `name` (default: the current one), loading it if needed.
+
+        With progressive=True a page that is not open yet comes back empty
+        with page.loading set, and the caller drives page.load_steps().
+        """
+        name = self.current if name is None else name
+        if self.pages[name] is None:
+            page = Page(self.path(self.files[name]), self.saver)
+            self.pages[name] = page
+            if progressive:
+                page.loading = True
+            else:
+                page.load()
+        return self.pages[name]
+
+    def switch(self, name):
+        page = self.page(name)
+        self.current = name
+        self.save_index()
+        return page
+
+    def add_page(self):
+        """Create an empty page with a fresh name and task file; returns its name."""
+        idx = len(self.pages) + 1
+        while f"Page {idx}" in self.pages:
+            idx += 1
+        name = f"Page {idx}"
+
+        stem, ext = os.path.splitext(FILENAME)
+        n = idx
+        while (f"{stem}-{n}{ext}" in self.files.values()
+               or os.path.exists(self.path(f"{stem}-{n}{ext}"))):
+            n += 1
+
+        self.pages[name] = Page(self.path(f"{stem}-{n}{ext}"), self.saver)
+        self.files[name] = f"{stem}-{n}{ext}"
+        self.save_index()
+        return name
+
+    def search(self, query, limit=50, fuzzy=False):
+        """The best `limit` hits for `query` (lowercased) on every page.
+
+        Each hit is a dict with the page name, kind, text, target and score
+        (see Page.search), best first and in tab order on equal scores.
+        Pages not opened yet or still loading are skipped (see unread_pages);
+        reading a big page takes seconds, which a keystroke cannot wait for.
+        """
+        hits = []
+        for name, page in self.pages.items():
+            if page is None or page.loading:
+                continue
+            hits.extend((name, hit) for hit in page.search(query, fuzzy, limit))
+        best = heapq.nsmallest(limit, hits, key=lambda item: -item[1][0])
+        return [
+            {"page": name, "kind": kind, "text": text, "target": target, "score": score}
+            for name, (score, kind, text, target) in best
+        ]
+
+    def unread_pages(self):
+        """Names of the pages search() skips: not opened yet, or still loading."""
+        return [name for name, page in self.pages.items() if page is None or page.loading]
+
+    def flush(self, timeout=5):
+        self.saver.flush(timeout)